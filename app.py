@@ -1,11 +1,10 @@
+import copy
 import streamlit as st
 import numpy as np
-from nozzle import Nozzle
-from geometry import get_A, get_parabolic_A
-from rocketisp.geometry import Geometry
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import time
+from nozzle import Nozzle, NozzleGeometry
+from instrumentation import Trace
+from atlas import ProfileAtlas
+from geometry import get_cached_A, get_parabolic_A, SSME_DEFAULT_PARAMS
 
 # Page configuration
 st.set_page_config(
@@ -348,17 +347,59 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # Default preset nozzle configuration (SSME)
-DEFAULT_PRESET = {
-    'Rthrt': 5.1527,
-    'CR': 3.0,
-    'eps': 77.5,
-    'LnozInp': 121.0,
-    'RupThroat': 1.0,
-    'RdwnThroat': 0.392,
-    'RchmConv': 1.73921,
-    'cham_conv_deg': 25.42,
-    'LchmOvrDt': 2.4842/2
-}
+DEFAULT_PRESET = SSME_DEFAULT_PARAMS
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def load_geometry(geometry_type, geometry_key):
+    """NozzleGeometry for a geometry (type and parameter items), shared by all sessions and gammas."""
+    if geometry_type == 'SSME':
+        A, xmin, xmax = get_cached_A(**dict(geometry_key))
+    else:
+        A, xmin, xmax = get_parabolic_A(**dict(geometry_key))
+    return NozzleGeometry(A, xmin, xmax)
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def load_nozzle(geometry_type, geometry_key, gamma, R):
+    """Nozzle for a geometry and gas, shared by all sessions; changing only
+    gamma or R reuses the geometry's grid and areas."""
+    return Nozzle.from_geometry(load_geometry(geometry_type, geometry_key), gamma, R)
+
+
+# Plotted points per trace; finer solver grids are downsampled (LTTB) to this
+PLOT_MAX_POINTS = 1500
+# Frames of the animated sweep: log-spaced over the slider range, plus extra
+# frames across the (often narrow) subsonic and normal-shock bands
+SWEEP_FRAMES = 141
+SWEEP_BAND_FRAMES = {'subsonic': 10, 'normal_shock': 30}
+
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def flow_figure(geometry_type, geometry_key, gamma, R, p_ratio, _profile=None):
+    """Flow profile figure at p_ratio and the solver trace summary of computing it.
+
+    _profile is a precomputed FlowProfile from the atlas (not part of the cache key).
+    """
+    # the cached nozzle is shared between sessions; trace a shallow copy
+    nozzle = copy.copy(load_nozzle(geometry_type, geometry_key, gamma, R))
+    nozzle.trace = Trace()
+    fig = nozzle.plot_flow_profile_plotly(p_ratio, _profile, max_points=PLOT_MAX_POINTS)
+    return fig, nozzle.trace.summary()
+
+
+@st.cache_data(ttl=3600, max_entries=16, show_spinner=False)
+def sweep_figure(geometry_type, geometry_key, gamma, R, log_min, log_max):
+    """Animated pb/p0 sweep (one batch solve) and the solver trace summary of computing it."""
+    nozzle = copy.copy(load_nozzle(geometry_type, geometry_key, gamma, R))
+    nozzle.trace = Trace()
+    bands = [
+        np.linspace(nozzle.crit_p_ratio_1, 1.0, SWEEP_BAND_FRAMES['subsonic'] + 2)[1:-1],
+        np.linspace(nozzle.crit_p_ratio_2, nozzle.crit_p_ratio_1, SWEEP_BAND_FRAMES['normal_shock'] + 2)[1:-1],
+    ]
+    pb = np.unique(np.concatenate([10.0 ** np.linspace(log_min, log_max, SWEEP_FRAMES)] + bands))[::-1]
+    fig = nozzle.plot_flow_sweep_plotly(pb, max_points=PLOT_MAX_POINTS)
+    return fig, nozzle.trace.summary()
 
 # Initialize session state for geometry parameters
 if 'geometry_params' not in st.session_state:
@@ -420,7 +461,15 @@ st.sidebar.markdown("""
 # Use log10 space: from log10(1e-7) = -7 to log10(1) = 0
 log_min = -7.0
 log_max = 0.0
-log_default = np.log10(0.8)
+log_step = 0.0025
+
+
+def snap_log_p_ratio(value):
+    """Nearest slider step to ``value``, so the profile atlas can serve it."""
+    return float(np.clip(log_min + round((value - log_min) / log_step) * log_step, log_min, log_max))
+
+
+log_default = snap_log_p_ratio(np.log10(0.8))
 
 if 'log_p_ratio' not in st.session_state:
     st.session_state.log_p_ratio = log_default
@@ -445,10 +494,10 @@ st.sidebar.markdown("""
 
 # Definition of callbacks for increment/decrement
 def decrement_p_ratio():
-    st.session_state.log_p_ratio = max(log_min, st.session_state.log_p_ratio - 0.0025)
+    st.session_state.log_p_ratio = snap_log_p_ratio(st.session_state.log_p_ratio - log_step)
 
 def increment_p_ratio():
-    st.session_state.log_p_ratio = min(log_max, st.session_state.log_p_ratio + 0.0025)
+    st.session_state.log_p_ratio = snap_log_p_ratio(st.session_state.log_p_ratio + log_step)
 
 # Layout for integrated buttons and slider
 col_minus, col_slider, col_plus = st.sidebar.columns([1, 6, 1])
@@ -464,7 +513,7 @@ with col_slider:
         min_value=log_min,
         max_value=log_max,
         key="log_p_ratio", # Syncs directly with session state
-        step=0.0025,
+        step=log_step,
         label_visibility="collapsed"
     )
 
@@ -487,6 +536,12 @@ st.sidebar.markdown(f"""
 # Create placeholder for flow regime (will be populated after nozzle is created)
 flow_regime_placeholder = st.sidebar.empty()
 
+animate_sweep = st.sidebar.toggle(
+    "Animate sweep",
+    key="animate_sweep",
+    help="Solve the whole pb/p0 range once and play or scrub it in the browser"
+)
+
 st.sidebar.markdown("<br>", unsafe_allow_html=True)
 
 # === FLOW PARAMETERS (moved here, before geometry) ===
@@ -522,8 +577,6 @@ geometry_type = st.sidebar.radio(
 if geometry_type == 'SSME Geometry':
     geometry_type = 'SSME'
 # Keep 'Simple Parabolic' as is for internal use
-# Check if geometry type changed BEFORE updating session state
-geometry_type_changed = st.session_state.get('geometry_type') != geometry_type
 st.session_state.geometry_type = geometry_type
 
 # Reset to default button
@@ -648,19 +701,6 @@ if geometry_type == 'SSME':
         help="Length of the nozzle (mm)"
     )
 
-    # Check if geometry parameters changed
-    geometry_changed = (
-        Rthrt != st.session_state.geometry_params.get('Rthrt', Rthrt) or
-        CR != st.session_state.geometry_params.get('CR', CR) or
-        eps != st.session_state.geometry_params.get('eps', eps) or
-        LnozInp != st.session_state.geometry_params.get('LnozInp', LnozInp) or
-        RupThroat != st.session_state.geometry_params.get('RupThroat', RupThroat) or
-        RdwnThroat != st.session_state.geometry_params.get('RdwnThroat', RdwnThroat) or
-        RchmConv != st.session_state.geometry_params.get('RchmConv', RchmConv) or
-        cham_conv_deg != st.session_state.geometry_params.get('cham_conv_deg', cham_conv_deg) or
-        LchmOvrDt != st.session_state.geometry_params.get('LchmOvrDt', LchmOvrDt)
-    )
-
     # Update session state
     st.session_state.geometry_params = {
         'Rthrt': Rthrt,
@@ -673,7 +713,6 @@ if geometry_type == 'SSME':
         'cham_conv_deg': cham_conv_deg,
         'LchmOvrDt': LchmOvrDt
     }
-    parabolic_changed = False
 
 else:  # Simple Parabolic geometry
     st.sidebar.markdown("""
@@ -731,16 +770,6 @@ else:  # Simple Parabolic geometry
         help="Maximum x coordinate"
     )
     
-    # Check if parabolic parameters changed (before updating session state)
-    old_params = st.session_state.parabolic_params.copy()
-    parabolic_changed = (
-        a != old_params.get('a', a) or
-        b != old_params.get('b', b) or
-        c != old_params.get('c', c) or
-        xmin_parab != old_params.get('xmin', xmin_parab) or
-        xmax_parab != old_params.get('xmax', xmax_parab)
-    )
-    
     # Update session state
     st.session_state.parabolic_params = {
         'a': a,
@@ -749,7 +778,6 @@ else:  # Simple Parabolic geometry
         'xmin': xmin_parab,
         'xmax': xmax_parab
     }
-    geometry_changed = False
 
 # Validation function
 def validate_geometry_params(Rthrt, CR, eps, LnozInp, RupThroat, RdwnThroat, RchmConv, cham_conv_deg, LchmOvrDt):
@@ -783,115 +811,51 @@ if geometry_type == 'SSME':
 else:
     validation_errors = []
 
-# Recreate geometry and nozzle if parameters changed or if nozzle doesn't exist
-# Initialize variables if not set
+# Nozzles are cached per geometry and gas, so returning to an earlier
+# configuration (in any session) reuses the solved nozzle
 if geometry_type == 'SSME':
-    if 'geometry_changed' not in locals():
-        geometry_changed = False
-    parabolic_changed = False
+    geometry_key = tuple(st.session_state.geometry_params.items())
 else:
-    if 'parabolic_changed' not in locals():
-        parabolic_changed = False
-    if 'geometry_changed' not in locals():
-        geometry_changed = False
-
-geometry_changed_check = geometry_changed if geometry_type == 'SSME' else parabolic_changed
+    geometry_key = tuple(st.session_state.parabolic_params.items())
 
-# Get flow parameters from session state (will be updated by inputs later)
-current_gamma = st.session_state.get('gamma', 1.4)
-current_R = st.session_state.get('R', 287)
-
-if (geometry_changed_check or geometry_type_changed or 'nozzle' not in st.session_state) and not validation_errors:
+if validation_errors:
+    if 'nozzle_key' not in st.session_state:
+        st.warning("Please fix validation errors to continue.")
+        st.stop()
+else:
     try:
-        start_time = time.time()
-        if geometry_type == 'SSME':
-            # SSME Geometry from https://rocketisp.readthedocs.io/en/latest/models.html#geometry
-            G = Geometry(
-                Rthrt=Rthrt, CR=CR, eps=eps, LnozInp=LnozInp,
-                RupThroat=RupThroat, RdwnThroat=RdwnThroat, 
-                RchmConv=RchmConv, cham_conv_deg=cham_conv_deg,
-                LchmOvrDt=LchmOvrDt
-            )
-            A, xmin, xmax = get_A(G)
-        else:  # Simple Parabolic
-            A, xmin, xmax = get_parabolic_A(
-                a=st.session_state.parabolic_params['a'],
-                b=st.session_state.parabolic_params['b'],
-                c=st.session_state.parabolic_params['c'],
-                xmin=st.session_state.parabolic_params['xmin'],
-                xmax=st.session_state.parabolic_params['xmax']
-            )
-        
-        # Use flow parameters from session state
-        # Create nozzle instance
-        nozzle = Nozzle(A, xmin=xmin, xmax=xmax, gamma=current_gamma, R=current_R)
-        st.session_state.nozzle = nozzle
-        st.session_state.crit_p_ratio_1 = nozzle.crit_p_ratio_1
-        st.session_state.crit_p_ratio_2 = nozzle.crit_p_ratio_2
-        st.session_state.crit_p_ratio_3 = nozzle.crit_p_ratio_3
-        calc_time = time.time() - start_time
-        st.session_state.sim_status = "idle"
-        st.session_state.geometry_calc_time = calc_time
-        st.session_state.geometry_type = geometry_type
-        st.session_state.gamma = current_gamma
-        st.session_state.R = current_R
+        load_nozzle(geometry_type, geometry_key, gamma, R)
+        st.session_state.nozzle_key = (geometry_type, geometry_key, gamma, R)
+        st.session_state.gamma = gamma
+        st.session_state.R = R
     except Exception as e:
         st.error(f"Failed to create nozzle geometry: {str(e)}")
-        st.session_state.sim_status = "error"
         # Use previous nozzle if available
-        if 'nozzle' in st.session_state:
-            nozzle = st.session_state.nozzle
-        else:
+        if 'nozzle_key' not in st.session_state:
             st.stop()
-elif 'nozzle' in st.session_state:
-    nozzle = st.session_state.nozzle
-else:
-    st.warning("Please fix validation errors to continue.")
-    st.stop()
-
 
-# Check if flow parameters changed and recreate nozzle if needed
-flow_params_changed = (
-    gamma != st.session_state.get('gamma', gamma)
-)
-
-if flow_params_changed and 'nozzle' in st.session_state and not validation_errors:
-    try:
-        # Get current geometry
-        if st.session_state.geometry_type == 'SSME':
-            G = Geometry(
-                Rthrt=st.session_state.geometry_params['Rthrt'],
-                CR=st.session_state.geometry_params['CR'],
-                eps=st.session_state.geometry_params['eps'],
-                LnozInp=st.session_state.geometry_params['LnozInp'],
-                RupThroat=st.session_state.geometry_params['RupThroat'],
-                RdwnThroat=st.session_state.geometry_params['RdwnThroat'],
-                RchmConv=st.session_state.geometry_params['RchmConv'],
-                cham_conv_deg=st.session_state.geometry_params['cham_conv_deg'],
-                LchmOvrDt=st.session_state.geometry_params['LchmOvrDt']
-            )
-            A, xmin, xmax = get_A(G)
-        else:
-            A, xmin, xmax = get_parabolic_A(
-                a=st.session_state.parabolic_params['a'],
-                b=st.session_state.parabolic_params['b'],
-                c=st.session_state.parabolic_params['c'],
-                xmin=st.session_state.parabolic_params['xmin'],
-                xmax=st.session_state.parabolic_params['xmax']
-            )
-        
-        # Recreate nozzle with new flow parameters
-        nozzle = Nozzle(A, xmin=xmin, xmax=xmax, gamma=gamma, R=R)
-        st.session_state.nozzle = nozzle
-        st.session_state.crit_p_ratio_1 = nozzle.crit_p_ratio_1
-        st.session_state.crit_p_ratio_2 = nozzle.crit_p_ratio_2
-        st.session_state.crit_p_ratio_3 = nozzle.crit_p_ratio_3
-        st.session_state.gamma = gamma
-        st.session_state.R = R
-        # Update nozzle variable for current run
-        nozzle = st.session_state.nozzle
-    except Exception as e:
-        st.error(f"Failed to update nozzle with new flow parameters: {str(e)}")
+# Fall back to the last valid configuration on errors
+nozzle_key = st.session_state.nozzle_key
+nozzle = load_nozzle(*nozzle_key)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_atlas(geometry_type, geometry_key, gamma, R):
+    """Profile atlas of every slider step for a nozzle, shared by all sessions."""
+    n_steps = int(round((log_max - log_min) / log_step)) + 1
+    return ProfileAtlas(load_nozzle(geometry_type, geometry_key, gamma, R),
+                        10.0 ** np.linspace(log_min, log_max, n_steps))
+
+
+# Precompute every slider step in the background, nearest the current value
+# first; sessions on the same nozzle share one atlas
+atlas = load_atlas(*nozzle_key)
+# Stop the atlas this session leaves (nozzle changed or evicted); a session
+# still on it restarts it on its next run
+previous_atlas = st.session_state.get('atlas')
+if previous_atlas is not None and previous_atlas is not atlas:
+    previous_atlas.stop()
+st.session_state.atlas = atlas
+atlas.start(p_ratio)
 
 # Determine flow regime based on p_ratio (calculated earlier in sidebar)
 if p_ratio > nozzle.crit_p_ratio_1:
@@ -946,14 +910,13 @@ with plot_col:
         "><div class="rotating">⚙️</div> Solving...</div>
     """, unsafe_allow_html=True)
 
-    # Perform calculation
+    # Perform calculation (cached per nozzle and pb/p0)
     try:
-        start_time = time.time()
-        # Small delay to ensure the spinning animation is visible to user
-        time.sleep(0.3) 
-        fig = nozzle.plot_flow_profile_plotly(p_ratio)
-        calc_time = time.time() - start_time
-        st.session_state.flow_calc_time = calc_time
+        if animate_sweep:
+            fig, st.session_state.flow_trace = sweep_figure(*nozzle_key, log_min, log_max)
+        else:
+            # steps the atlas has not reached yet are solved live
+            fig, st.session_state.flow_trace = flow_figure(*nozzle_key, p_ratio, _profile=atlas.lookup(p_ratio))
         
         # Update status to Ready (static)
         status_placeholder.markdown("""
@@ -972,6 +935,9 @@ with plot_col:
         """, unsafe_allow_html=True)
         
         st.plotly_chart(fig, width="stretch")
+        if animate_sweep:
+            st.caption("Press ▶ Play or drag the slider below the plot to sweep p_b/p₀ from 1 down to 10⁻⁷; "
+                       "all frames are computed in one batch and play in the browser.")
         
     except Exception as e:
         status_placeholder.empty()
@@ -988,3 +954,17 @@ with col2:
     st.metric("Normal Shock @ Exit", f"{nozzle.crit_p_ratio_2:.4f}", help="Normal shock exactly at nozzle exit plane")
 with col3:
     st.metric("Design Condition", f"{nozzle.crit_p_ratio_3:.4f}", help="Isentropic expansion to exit pressure (Shock-Free)")
+
+# Solver diagnostics for the profile above
+flow_trace = st.session_state.get('flow_trace')
+if flow_trace:
+    with st.expander("Solver Diagnostics"):
+        timings = flow_trace['timings']
+        phase_cols = st.columns(max(len(timings), 1))
+        for col, (phase, seconds) in zip(phase_cols, timings.items()):
+            with col:
+                st.metric(phase.replace('_', ' ').title(), f"{seconds * 1e3:.2f} ms")
+        st.caption("Phases are timed inclusively: Flow Profile contains Interior, Shock Location and Plume. "
+                   "Profiles served from the precomputed atlas only time the Figure.")
+        st.caption(f"Profile atlas: {atlas.n_computed} of {len(atlas)} slider steps precomputed.")
+        st.table({'counter': list(flow_trace['counters']), 'value': list(flow_trace['counters'].values())})
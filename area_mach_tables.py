@@ -0,0 +1,123 @@
+"""Precomputed inverse area-Mach tables (A/A* -> M) keyed by gamma.
+
+Each table holds both branches of the area-Mach relation sampled in the
+variable s = sqrt(log(A/A*)), in which M is smooth through the throat, so a
+plain linear interpolation gives a starting guess that
+``Nozzle.solve_mach_numbers_from_area_ratios`` polishes to full accuracy
+in one or two Newton steps.
+
+Tables are kept in a bounded in-process LRU. If a table directory is set
+(``set_table_dir`` or the ``NOZZLE_TABLE_DIR`` environment variable) they
+are also saved as ``.npy`` files, and later processes memory-map them
+instead of rebuilding.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+TABLE_SIZE = 4096
+M_MAX = 20.0  # upper end of the supersonic bracket used by the solver
+
+
+def _log_area_mach(m, gamma):
+    """log(A/A*) as a function of M."""
+    k = (gamma + 1) / (2 * (gamma - 1))
+    return k * np.log(2 / (gamma + 1) * (1 + (gamma - 1) / 2 * m**2)) - np.log(m)
+
+
+def build_table(gamma, n=TABLE_SIZE):
+    """Sample both branches and return a (4, n) array [s_sub, M_sub, s_sup, M_sup].
+
+    Rows are sorted by increasing s so they can be fed to ``np.interp``.
+    """
+    log_r_max = _log_area_mach(M_MAX, gamma)
+    k = (gamma + 1) / (2 * (gamma - 1))
+    # subsonic M whose area ratio is past the supersonic end of the table
+    m_min = 0.5 * (2 / (gamma + 1)) ** k * np.exp(-log_r_max)
+
+    M_sup = np.exp(np.linspace(0.0, np.log(M_MAX), n))
+    M_sub = np.exp(np.linspace(0.0, np.log(m_min), n))  # decreasing M -> increasing s
+    s_sup = np.sqrt(np.maximum(_log_area_mach(M_sup, gamma), 0.0))
+    s_sub = np.sqrt(np.maximum(_log_area_mach(M_sub, gamma), 0.0))
+    return np.vstack([s_sub, M_sub, s_sup, M_sup])
+
+
+class AreaMachTableCache(object):
+    """Bounded LRU of inverse area-Mach tables with optional .npy storage."""
+
+    def __init__(self, maxsize=8, table_dir=None, n=TABLE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.table_dir = table_dir
+        self.n = n
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, gamma):
+        return os.path.join(self.table_dir, f"area_mach_g{gamma:.12g}_n{self.n}.npy")
+
+    def _load_or_build(self, gamma):
+        if self.table_dir is None:
+            return build_table(gamma, self.n)
+        path = self._path(gamma)
+        if os.path.exists(path):
+            try:
+                return np.load(path, mmap_mode='r')
+            except (OSError, ValueError):
+                pass  # truncated or foreign file: rebuild below
+        table = build_table(gamma, self.n)
+        try:
+            os.makedirs(self.table_dir, exist_ok=True)
+            # unique per process and thread: another thread may be building the same gamma
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+            np.save(tmp, table)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # read-only location: keep the in-memory table
+        return table
+
+    def get(self, gamma):
+        """Return the (4, n) table for ``gamma``, building or loading it on a miss."""
+        key = float(gamma)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                return table
+        table = self._load_or_build(key)
+        with self._lock:
+            self._tables[key] = table
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.maxsize:
+                self._tables.popitem(last=False)
+        return table
+
+    def lookup(self, ratios, gamma, is_subsonic=True):
+        """Interpolated M for each A/A* in ``ratios`` (not yet polished)."""
+        s_sub, M_sub, s_sup, M_sup = self.get(gamma)
+        s = np.sqrt(np.log(np.maximum(ratios, 1.0)))
+        return np.where(is_subsonic, np.interp(s, s_sub, M_sub), np.interp(s, s_sup, M_sup))
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+    def __len__(self):
+        return len(self._tables)
+
+    def __contains__(self, gamma):
+        return float(gamma) in self._tables
+
+
+default_cache = AreaMachTableCache(table_dir=os.environ.get("NOZZLE_TABLE_DIR"))
+
+
+def set_table_dir(path):
+    """Store tables under ``path`` (None keeps them in memory only)."""
+    default_cache.table_dir = path
+    default_cache.clear()
+
+
+def lookup(ratios, gamma, is_subsonic=True):
+    return default_cache.lookup(ratios, gamma, is_subsonic)
@@ -0,0 +1,266 @@
+"""Performance benchmarks for the nozzle solver, geometry and plotting paths.
+
+Run from the project root::
+
+    python benchmark.py                      # run, print, compare with baseline
+    python benchmark.py -o results.json      # also write the results
+    python benchmark.py --save-baseline      # store this run as the baseline
+    python benchmark.py -k sweep -k ctor     # only cases whose name matches
+    python benchmark.py --check-imports      # only check the import-time budget
+
+Every case is timed with timeit (auto-ranged loop count, best and median
+of several repeats) on fixed geometries: the default parabolic nozzle and
+the SSME preset. Results are JSON: run metadata plus, per case, seconds
+per call. When a baseline file exists, each case is compared with it and
+the run exits with status 1 if any case got slower than ``--threshold``
+times its baseline.
+
+``--check-imports`` checks the solver modules against IMPORT_BUDGETS
+(seconds on top of a bare interpreter start) and verifies that importing
+them does not pull in plotting libraries or rocketisp.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+import numpy as np
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+GRID_SIZES = (250, 1000, 4000, 16000)
+SWEEP_SIZES = (10, 100, 1000, 10000)
+REGIMES = ('subsonic', 'normal_shock', 'oblique_shock', 'expansion_fan')
+
+# import time budget per module, in seconds over a bare interpreter start
+IMPORT_BUDGETS = {'nozzle': 0.25, 'geometry': 0.25, 'flow_profile': 0.25}
+# modules the solver core must only import on first use
+LAZY_MODULES = ('matplotlib', 'plotly', 'rocketisp', 'scipy.optimize')
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """Seconds per call of ``func``: best and median over ``repeat`` runs."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    times = np.array(timer.repeat(repeat=repeat, number=number)) / number
+    return {'best': float(times.min()), 'median': float(np.median(times)), 'loops': number, 'repeat': repeat}
+
+
+def measure_import(module, repeat=5):
+    """Wall time of ``python -c 'import module'`` minus a bare interpreter start."""
+    def run(code):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        return time.perf_counter() - t0
+    bare = min(run('pass') for _ in range(repeat))
+    times = np.array([run(f'import {module}') for _ in range(repeat)]) - bare
+    return {'best': float(times.min()), 'median': float(np.median(times)), 'loops': 1, 'repeat': repeat}
+
+
+def check_imports(repeat=5):
+    """Check IMPORT_BUDGETS and LAZY_MODULES.
+
+    Returns:
+        list of failure messages (empty if all checks pass)
+    """
+    failures = []
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    for module, budget in IMPORT_BUDGETS.items():
+        timing = measure_import(module, repeat)
+        status = 'ok' if timing['best'] <= budget else 'OVER BUDGET'
+        print(f"import {module:20s} {format_seconds(timing['best']):>10s}  (budget {format_seconds(budget)})  {status}")
+        if timing['best'] > budget:
+            failures.append(f"import {module} took {timing['best']:.3f} s, budget {budget:.3f} s")
+        code = (f"import sys, {module}; "
+                f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+        loaded = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True,
+                                text=True, cwd=cwd).stdout.strip()
+        if loaded:
+            failures.append(f"import {module} loads {loaded}")
+    return failures
+
+
+def regime_pressures(nozzle):
+    """One pb/p0 inside each flow regime of ``nozzle``."""
+    c1, c2, c3 = nozzle.crit_p_ratio_1, nozzle.crit_p_ratio_2, nozzle.crit_p_ratio_3
+    return dict(zip(REGIMES, ((1.0 + c1) / 2, (c1 + c2) / 2, (c2 + c3) / 2, c3 / 2)))
+
+
+def geometries():
+    """Fixed benchmark geometries: name -> (A, xmin, xmax, gamma)."""
+    from geometry import SSME_DEFAULT_PARAMS, get_cached_A, get_parabolic_A
+    return {
+        'parabolic': get_parabolic_A() + (1.4,),
+        'ssme': get_cached_A(**SSME_DEFAULT_PARAMS) + (1.2,),
+    }
+
+
+def cases(quick=False):
+    """Yield (name, thunk) pairs; each thunk returns a timing dict."""
+    yield 'import.nozzle', lambda: measure_import('nozzle')
+    yield 'import.geometry', lambda: measure_import('geometry')
+
+    from geometry import SSME_DEFAULT_PARAMS, get_cached_A, get_parabolic_A
+    from nozzle import Nozzle
+
+    def build_ssme():
+        get_cached_A.cache_clear()
+        get_cached_A(**SSME_DEFAULT_PARAMS)
+
+    yield 'geometry.ssme', lambda: measure(build_ssme)
+    yield 'geometry.parabolic', lambda: measure(get_parabolic_A)
+
+    grid_sizes = GRID_SIZES[:2] if quick else GRID_SIZES
+    sweep_sizes = SWEEP_SIZES[:3] if quick else SWEEP_SIZES
+
+    for geom, (A, xmin, xmax, gamma) in geometries().items():
+        make = lambda n=1000: Nozzle(A, xmin=xmin, xmax=xmax, gamma=gamma, R=287.0, n_points=n)
+        nozzle = make()
+        pbs = regime_pressures(nozzle)
+
+        yield f'ctor.{geom}', lambda make=make: measure(make)
+        yield (f'ctor_gas.{geom}',
+               lambda nozzle=nozzle, gamma=gamma: measure(lambda: nozzle.with_gas(gamma + 0.05)))
+
+        def choked(nozzle=nozzle):
+            nozzle._invalidate_flow_cache()
+            return nozzle.choked_solution
+        yield f'choked_solution.{geom}', lambda f=choked: measure(f)
+
+        for regime, pb in pbs.items():
+            yield (f'profile.{geom}.{regime}',
+                   lambda nozzle=nozzle, pb=pb: measure(lambda: nozzle._calculate_flow_profile(pb)))
+
+        for n in grid_sizes:
+            def ctor_and_solve(n=n, pb=pbs['normal_shock']):
+                make(n)._calculate_flow_profile(pb)
+            yield f'grid.{geom}.n{n}', lambda f=ctor_and_solve: measure(f, repeat=3)
+
+        for k in sweep_sizes:
+            pb_array = np.linspace(0.01, 0.99, k)
+            yield (f'sweep.{geom}.k{k}',
+                   lambda nozzle=nozzle, pb_array=pb_array: measure(lambda: nozzle.sweep(pb_array), repeat=3))
+
+        for regime, pb in pbs.items():
+            yield (f'plot_plotly.{geom}.{regime}',
+                   lambda nozzle=nozzle, pb=pb: measure(lambda: nozzle.plot_flow_profile_plotly(pb), repeat=3))
+
+        fine = make(GRID_SIZES[-1])
+        yield (f'plot_plotly_lttb.{geom}.n{GRID_SIZES[-1]}',
+               lambda fine=fine, pb=pbs['normal_shock']:
+               measure(lambda: fine.plot_flow_profile_plotly(pb, max_points=1500), repeat=3))
+
+        frames = np.geomspace(1.0, 1e-7, 141)
+        yield (f'plot_plotly_sweep.{geom}.f{len(frames)}',
+               lambda nozzle=nozzle, frames=frames: measure(lambda: nozzle.plot_flow_sweep_plotly(frames), repeat=3))
+
+        def plot_mpl(nozzle=nozzle, pb=pbs['normal_shock']):
+            import matplotlib.pyplot as plt
+            plt.close(nozzle.plot_flow_profile(pb))
+        yield f'plot_matplotlib.{geom}.normal_shock', lambda f=plot_mpl: measure(f, repeat=3)
+
+
+def run(filters=(), quick=False, log=print):
+    import matplotlib
+    matplotlib.use('Agg')
+    results = {}
+    for name, thunk in cases(quick):
+        if filters and not any(f in name for f in filters):
+            continue
+        results[name] = thunk()
+        log(f"{name:45s} {format_seconds(results[name]['best']):>10s}"
+            f"  (median {format_seconds(results[name]['median'])})")
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    import scipy
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def format_seconds(t):
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if t >= scale:
+            return f"{t / scale:.3g} {unit}"
+    return f"{t / 1e-9:.3g} ns"
+
+
+def compare(results, baseline, threshold=1.25):
+    """Ratios of best times against ``baseline`` results.
+
+    Returns:
+        list of (name, ratio, regressed) for cases present in both runs
+    """
+    rows = []
+    for name, timing in results.items():
+        if name in baseline:
+            ratio = timing['best'] / baseline[name]['best']
+            rows.append((name, ratio, ratio > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-o', '--output', help='write results as JSON to this file')
+    parser.add_argument('-k', dest='filters', action='append', default=[],
+                        help='only run cases whose name contains this string (repeatable)')
+    parser.add_argument('--quick', action='store_true', help='skip the largest grid and sweep sizes')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='write this run to the baseline file')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown ratio reported as a regression (default 1.25)')
+    parser.add_argument('--check-imports', action='store_true',
+                        help='only check the import-time budget and lazy imports')
+    args = parser.parse_args(argv)
+
+    if args.check_imports:
+        failures = check_imports()
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        return 1 if failures else 0
+
+    report = {'meta': metadata(), 'results': run(args.filters, args.quick)}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(report['results'], baseline['results'], args.threshold)
+    print(f"\nCompared with baseline {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for name, ratio, regressed in rows:
+        print(f"{name:45s} {ratio:6.2f}x{'  REGRESSION' if regressed else ''}")
+    return 1 if any(regressed for _, _, regressed in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""Headless batch solver: nozzle flow profiles from the command line.
+
+Examples::
+
+    python cli.py --gamma 1.4 --pb 0.9 0.5 0.1 -o out.csv
+    python cli.py --geometry ssme --param eps=40 --gamma 1.2 1.25 \\
+        --pb-range 0.001 1 2000 --log -o out.npz
+    python cli.py --param a=2 --param c=0.3 --gamma 1.4 \\
+        --pb-range 0.01 0.99 100 --reduce exit,shock --format jsonl
+
+The geometry is the parabolic nozzle A(x) = a*(x-b)^2 + c (parameters a,
+b, c, xmin, xmax) or a rocketisp contour (``--geometry ssme``, the SSME
+preset, with any of its parameters overridden by ``--param``).
+
+Output formats (``--format``; default from the ``-o`` extension, csv on
+stdout):
+
+csv
+    one row per case and axial point: gamma, pb_p0, regime, x_shock, x, M, p.
+    The critical pressure ratios of each gamma and the regime codes are
+    written first as '#' comment lines.
+npz
+    per case: gamma, pb_p0, regime, x_shock, beta, x_extended; per point:
+    x; per case and point: M, p; per gamma: gammas, crit_p_ratios (3 columns).
+jsonl
+    one JSON object per case with its scalars, crit_p_ratios and the x, M
+    and p lists.
+
+With ``--reduce`` (names from streaming.REDUCTIONS) only per-case rows of
+scalars are written instead of whole profiles.
+"""
+import argparse
+import math
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+PARABOLIC_PARAM_NAMES = ('a', 'b', 'c', 'xmin', 'xmax')
+FORMATS = ('csv', 'npz', 'jsonl')
+MIN_CHUNK = 64  # fewest cases worth sending to a worker process
+
+
+def build_geometry(kind, params):
+    """(A, xmin, xmax) for a 'parabolic' or 'ssme' geometry spec."""
+    import geometry
+    if kind == 'parabolic':
+        return geometry.get_parabolic_A(**params)
+    full = dict(geometry.SSME_DEFAULT_PARAMS)
+    full.update(params)
+    return geometry.get_cached_A(**full)
+
+
+@lru_cache(maxsize=32)
+def build_nozzle_geometry(kind, params, n_points=1000, n_plume=100, grid='uniform'):
+    """NozzleGeometry for a geometry spec, ``params`` given as a tuple of items.
+
+    Cached, so the Nozzles for several gammas on one geometry share its grid
+    and area arrays (see Nozzle.from_geometry).
+    """
+    from nozzle import NozzleGeometry
+    A, xmin, xmax = build_geometry(kind, dict(params))
+    return NozzleGeometry(A, xmin, xmax, n_points=n_points, n_plume=n_plume, grid=grid)
+
+
+def _solve_chunk(kind, params, gamma, R, pb_p0_ratios, nozzle_kwargs, reduce):
+    """Worker task: one gamma, a chunk of pb/p0 values.
+
+    Returns:
+        (crit_p_ratios, structured array of profiles or reduced rows)
+    """
+    from nozzle import Nozzle
+    nozzle_kwargs = dict(nozzle_kwargs)
+    backend = nozzle_kwargs.pop('backend', None)
+    geometry = build_nozzle_geometry(kind, tuple(sorted(params.items())), **nozzle_kwargs)
+    nozzle = Nozzle.from_geometry(geometry, gamma, R, backend=backend)
+    crit = (nozzle.crit_p_ratio_1, nozzle.crit_p_ratio_2, nozzle.crit_p_ratio_3)
+    profiles = nozzle.sweep(pb_p0_ratios)
+    if reduce:
+        from streaming import make_reducer
+        return crit, make_reducer(nozzle, reduce)(profiles)
+    return crit, profiles.data
+
+
+def solve(kind, params, gammas, R, pb_p0_ratios, workers=1, reduce=None, **nozzle_kwargs):
+    """Sweep ``pb_p0_ratios`` for every gamma, split over ``workers`` processes.
+
+    Returns:
+        list of (gamma, crit_p_ratios, structured array) in gamma order
+    """
+    pb = np.asarray(pb_p0_ratios, dtype=float)
+    n_chunks = max(1, min(math.ceil(workers / len(gammas)), math.ceil(len(pb) / MIN_CHUNK)))
+    tasks = [(g, chunk) for g in gammas for chunk in np.array_split(pb, n_chunks)]
+    args = [(kind, params, g, R, chunk, nozzle_kwargs, reduce) for g, chunk in tasks]
+    if workers <= 1 or len(tasks) == 1:
+        outputs = [_solve_chunk(*a) for a in args]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            outputs = list(pool.map(_solve_chunk, *zip(*args)))
+    results = []
+    for i, g in enumerate(gammas):
+        parts = outputs[i * n_chunks:(i + 1) * n_chunks]
+        results.append((g, parts[0][0], np.concatenate([data for _, data in parts])))
+    return results
+
+
+def json_scalar(v):
+    """JSON-safe Python scalar (NaN -> None)."""
+    v = v.item() if hasattr(v, 'item') else v
+    return None if isinstance(v, float) and math.isnan(v) else v
+
+
+def write_csv(f, results, reduce):
+    from flow_profile import REGIME_NAMES
+    for g, crit, _ in results:
+        f.write(f"# gamma={g:.10g} crit_p_ratio_1={crit[0]:.10g} crit_p_ratio_2={crit[1]:.10g} "
+                f"crit_p_ratio_3={crit[2]:.10g}\n")
+    f.write("# regime: " + ", ".join(f"{i}={name}" for i, name in enumerate(REGIME_NAMES)) + "\n")
+    if reduce:
+        names = results[0][2].dtype.names
+        f.write(",".join(("gamma",) + names) + "\n")
+        for g, _, rows in results:
+            table = np.column_stack([np.full(len(rows), g)] + [rows[name].astype(float) for name in names])
+            np.savetxt(f, table, fmt='%.10g', delimiter=',')
+        return
+    f.write("gamma,pb_p0,regime,x_shock,x,M,p\n")
+    for g, _, data in results:
+        k, n = data['M'].shape
+        table = np.column_stack([
+            np.full(k * n, g),
+            np.repeat(data['pb_p0'], n),
+            np.repeat(data['regime'], n),
+            np.repeat(data['x_shock'], n),
+            data['x'].ravel(),
+            data['M'].ravel(),
+            data['p'].ravel(),
+        ])
+        np.savetxt(f, table, fmt='%.10g', delimiter=',')
+
+
+def write_jsonl(f, results, reduce):
+    import json
+    from flow_profile import REGIME_NAMES
+    for g, crit, data in results:
+        crit = [float(c) for c in crit]
+        for row in data:
+            if reduce:
+                record = {name: json_scalar(row[name]) for name in data.dtype.names}
+            else:
+                record = {name: json_scalar(row[name]) for name in
+                          ('pb_p0', 'regime', 'x_shock', 'beta', 'x_extended')}
+                record.update(x=row['x'].tolist(), M=row['M'].tolist(), p=row['p'].tolist())
+            record['regime_name'] = REGIME_NAMES[int(row['regime'])]
+            f.write(json.dumps({'gamma': g, 'crit_p_ratios': crit, **record}) + "\n")
+
+
+def write_npz(f, results, reduce):
+    data = np.concatenate([d for _, _, d in results])
+    arrays = {
+        'gammas': np.array([g for g, _, _ in results]),
+        'crit_p_ratios': np.array([crit for _, crit, _ in results]),
+        'gamma': np.concatenate([np.full(len(d), g) for g, _, d in results]),
+    }
+    if reduce:
+        arrays.update({name: data[name] for name in data.dtype.names})
+    else:
+        arrays.update({name: data[name] for name in ('pb_p0', 'regime', 'x_shock', 'beta', 'x_extended', 'M', 'p')})
+        arrays['x'] = data['x'][0]
+    np.savez(f, **arrays)
+
+
+WRITERS = {'csv': write_csv, 'npz': write_npz, 'jsonl': write_jsonl}
+
+
+def parse_params(parser, items, kind):
+    import geometry
+    allowed = PARABOLIC_PARAM_NAMES if kind == 'parabolic' else geometry.GEOMETRY_PARAM_NAMES
+    params = {}
+    for item in items:
+        key, sep, value = item.partition('=')
+        if not sep or key not in allowed:
+            parser.error(f"--param {item!r}: expected NAME=VALUE with NAME in {', '.join(allowed)}")
+        try:
+            params[key] = float(value)
+        except ValueError:
+            parser.error(f"--param {item!r}: {value!r} is not a number")
+    return params
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Solve quasi-1D nozzle flow profiles for many back-pressure ratios.",
+        epilog="See the module docstring of cli.py for the output layouts.")
+    geom = parser.add_argument_group('geometry')
+    geom.add_argument('--geometry', choices=('parabolic', 'ssme'), default='parabolic',
+                      help="parabolic A(x) = a*(x-b)^2 + c, or a rocketisp contour starting from the "
+                           "SSME preset (default: parabolic)")
+    geom.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                      help="geometry parameter (repeatable): a, b, c, xmin, xmax for parabolic; "
+                           "rocketisp names such as eps, Rthrt, LnozInp for ssme")
+    gas = parser.add_argument_group('gas and back pressure')
+    gas.add_argument('--gamma', type=float, nargs='+', required=True, help='ratio of specific heats (one or more)')
+    gas.add_argument('--R', type=float, default=287.0, help='gas constant (default 287)')
+    gas.add_argument('--pb', type=float, nargs='+', default=[], metavar='PB_P0', help='pb/p0 values')
+    gas.add_argument('--pb-range', type=float, nargs=3, metavar=('START', 'STOP', 'NUM'),
+                     help='NUM pb/p0 values from START to STOP (inclusive)')
+    gas.add_argument('--log', action='store_true', help='space --pb-range logarithmically')
+    num = parser.add_argument_group('solver')
+    num.add_argument('--n-points', type=int, default=1000, help='axial points in the nozzle (default 1000)')
+    num.add_argument('--n-plume', type=int, default=100, help='points in the plume (default 100)')
+    num.add_argument('--grid', choices=('uniform', 'adaptive'), default='uniform')
+    num.add_argument('--backend', choices=('numpy', 'numba', 'auto'), default=None,
+                     help='numeric kernel backend (default: NOZZLE_BACKEND or numpy)')
+    num.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                     help='worker processes (default: CPU count; small runs stay in-process)')
+    out = parser.add_argument_group('output')
+    out.add_argument('-o', '--output', default='-', help="output file, '-' for stdout (default)")
+    out.add_argument('--format', choices=FORMATS, help='csv, npz or jsonl (default: from the file extension)')
+    out.add_argument('--reduce', help='comma-separated per-case reductions instead of full profiles, '
+                                      'e.g. exit,shock,mach_extrema')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    params = parse_params(parser, args.param, args.geometry)
+    if not all(g > 1 for g in args.gamma):
+        parser.error("--gamma values must be > 1")
+    if not args.R > 0:
+        parser.error("--R must be > 0")
+    pb = list(args.pb)
+    if args.pb_range is not None:
+        start, stop, num = args.pb_range
+        if num < 1 or num != int(num):
+            parser.error("--pb-range NUM must be a positive integer")
+        space = np.geomspace if args.log else np.linspace
+        pb.extend(space(start, stop, int(num)).tolist())
+    if not pb:
+        parser.error("give pb/p0 values with --pb and/or --pb-range")
+    pb = np.array(pb)
+    if np.any(pb <= 0) or np.any(pb > 1):
+        parser.error("pb/p0 values must be in (0, 1]")
+    reduce = [name.strip() for name in args.reduce.split(',')] if args.reduce else None
+    if reduce:
+        from streaming import REDUCTIONS
+        unknown = [name for name in reduce if name not in REDUCTIONS]
+        if unknown:
+            parser.error(f"unknown reductions {unknown}; choose from {sorted(REDUCTIONS)}")
+
+    fmt = args.format
+    if fmt is None:
+        ext = os.path.splitext(args.output)[1].lstrip('.').lower()
+        fmt = ext if ext in FORMATS else 'csv'
+
+    nozzle_kwargs = dict(n_points=args.n_points, n_plume=args.n_plume, grid=args.grid)
+    if args.backend is not None:
+        nozzle_kwargs['backend'] = args.backend
+    try:
+        results = solve(args.geometry, params, args.gamma, args.R, pb, workers=args.workers,
+                        reduce=reduce, **nozzle_kwargs)
+    except (ValueError, ImportError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    binary = fmt == 'npz'
+    if args.output == '-':
+        f = sys.stdout.buffer if binary else sys.stdout
+        try:
+            WRITERS[fmt](f, results, reduce)
+            f.flush()
+        except BrokenPipeError:
+            # reader went away (e.g. piped into head); silence the flush at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+    else:
+        with open(args.output, 'wb' if binary else 'w', newline=None if binary else '') as f:
+            WRITERS[fmt](f, results, reduce)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Parallel design-space exploration over geometry x gamma x back pressure.
+
+The Cartesian product of the geometry parameter ranges is split into one
+task per geometry. Each worker process builds that contour and its
+NozzleGeometry once and, for every gamma, derives a Nozzle sharing it
+(``Nozzle.from_geometry``) and sweeps all back-pressure ratios with
+``Nozzle.sweep``.
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from geometry import GEOMETRY_PARAM_NAMES, SSME_DEFAULT_PARAMS, get_cached_A
+from nozzle import Nozzle, NozzleGeometry
+
+
+def geometry_grid(geometry_ranges, base_params=None):
+    """All geometry parameter dicts in the product of ``geometry_ranges``.
+
+    ``geometry_ranges`` maps rocketisp parameter names (e.g. 'eps', 'Rthrt',
+    'LnozInp') to iterables of values; the remaining parameters come from
+    ``base_params`` (default: the SSME preset).
+    """
+    unknown = set(geometry_ranges) - set(GEOMETRY_PARAM_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown geometry parameters: {sorted(unknown)}")
+    base = dict(SSME_DEFAULT_PARAMS if base_params is None else base_params)
+    names = list(geometry_ranges)
+    for values in itertools.product(*(np.atleast_1d(geometry_ranges[k]).tolist() for k in names)):
+        params = dict(base)
+        params.update(zip(names, values))
+        yield params
+
+
+def _solve_geometry(params, gammas, pb_p0_ratios, R, nozzle_kwargs):
+    """Worker task: one geometry, every gamma and back pressure."""
+    cases = []
+    nozzle_kwargs = dict(nozzle_kwargs)
+    backend = nozzle_kwargs.pop('backend', None)
+    try:
+        A, xmin, xmax = get_cached_A(**params)
+        geometry = NozzleGeometry(A, xmin, xmax, **nozzle_kwargs)
+    except Exception as e:
+        return [dict(params=params, gamma=g, crit_p_ratios=None, profiles=None,
+                     error=f"geometry: {e}") for g in gammas]
+    for g in gammas:
+        try:
+            nozzle = Nozzle.from_geometry(geometry, g, R, backend=backend)
+            cases.append(dict(
+                params=params,
+                gamma=g,
+                crit_p_ratios=(nozzle.crit_p_ratio_1, nozzle.crit_p_ratio_2, nozzle.crit_p_ratio_3),
+                profiles=nozzle.sweep(pb_p0_ratios),
+                error=None,
+            ))
+        except Exception as e:
+            cases.append(dict(params=params, gamma=g, crit_p_ratios=None, profiles=None, error=str(e)))
+    return cases
+
+
+def explore(geometry_ranges, gammas, pb_p0_ratios, base_params=None, R=287.0,
+            max_workers=None, progress=None, **nozzle_kwargs):
+    """Solve every combination of geometry, gamma and pb/p0.
+
+    Parameters:
+    -----------
+    geometry_ranges : dict
+        rocketisp parameter name -> values, e.g. {'eps': [20, 40], 'Rthrt': [4, 5]}
+    gammas : iterable of float
+    pb_p0_ratios : array_like
+        Back-pressure ratios swept for every (geometry, gamma)
+    base_params : dict, optional
+        Values of the parameters not in geometry_ranges (default: SSME preset)
+    max_workers : int, optional
+        Worker processes (default: os.cpu_count()); 1 runs in this process
+    progress : callable, optional
+        Called as progress(done, total) after each geometry finishes
+    **nozzle_kwargs
+        Passed to Nozzle (n_points, n_plume, grid)
+
+    Returns:
+    --------
+    list of dict, one per (geometry, gamma) in product order, with keys
+    params, gamma, crit_p_ratios, profiles (FlowProfile batch over
+    pb_p0_ratios) and error (None, or the message if that case failed).
+    """
+    geometries = list(geometry_grid(geometry_ranges, base_params))
+    gammas = [float(g) for g in np.atleast_1d(gammas)]
+    pb_p0_ratios = np.atleast_1d(np.asarray(pb_p0_ratios, dtype=float))
+    total = len(geometries)
+    results = [None] * total
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    if max_workers == 1 or total <= 1:
+        for i, params in enumerate(geometries):
+            results[i] = _solve_geometry(params, gammas, pb_p0_ratios, R, nozzle_kwargs)
+            if progress is not None:
+                progress(i + 1, total)
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, total)) as pool:
+            futures = {
+                pool.submit(_solve_geometry, params, gammas, pb_p0_ratios, R, nozzle_kwargs): i
+                for i, params in enumerate(geometries)
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if progress is not None:
+                    progress(done, total)
+    return [case for cases in results for case in cases]
@@ -0,0 +1,183 @@
+"""Array-backed result type for nozzle flow profiles."""
+import numpy as np
+
+# Flow regime codes, in order of decreasing back pressure
+REGIME_SUBSONIC = 0
+REGIME_NORMAL_SHOCK = 1
+REGIME_OBLIQUE_SHOCK = 2
+REGIME_EXPANSION_FAN = 3
+REGIME_NAMES = ('subsonic', 'normal_shock', 'oblique_shock', 'expansion_fan')
+
+N_FAN_LINES = 7
+
+_SCALAR_FIELDS = [
+    ('pb_p0', 'f8'),
+    ('regime', 'i1'),
+    ('x_shock', 'f8'),
+    ('beta', 'f8'),
+    ('x_extended', 'f8'),
+    ('fan_alpha_tail', 'f8'),
+    ('fan_alpha_head', 'f8'),
+]
+# names of the per-profile scalar fields (everything but x, M and p)
+SCALAR_FIELDS = tuple(name for name, _ in _SCALAR_FIELDS)
+
+
+def profile_dtype(n_points):
+    """Record layout for one profile on ``n_points`` axial points."""
+    return np.dtype(_SCALAR_FIELDS + [
+        ('x', 'f8', (n_points,)),
+        ('M', 'f8', (n_points,)),
+        ('p', 'f8', (n_points,)),
+    ])
+
+
+class FlowProfile(object):
+    """One or many flow profiles stored in a single structured array.
+
+    Each record holds the axial grid, M(x) and p/p0(x) as fixed-length
+    fields plus scalar metadata: pb/p0, regime code, normal-shock location,
+    oblique-shock angle beta, oblique-shock centerline crossing x_extended
+    and the tail/head angles of the expansion fan. Metadata that does not
+    apply to a regime is NaN.
+
+    A single profile wraps a 0-d array and a batch a 1-d array. The array
+    attributes (``M``, ``p``, ``x``, ...) and indexing return views, not
+    copies.
+    """
+    __slots__ = ('data',)
+
+    def __init__(self, data) -> None:
+        if not isinstance(data, np.ndarray):
+            data = np.asarray(data)
+        if data.dtype.names is None or 'M' not in data.dtype.names:
+            raise TypeError("FlowProfile needs a structured array with profile_dtype fields")
+        self.data = data
+
+    @classmethod
+    def from_arrays(cls, x, M, p, pb_p0=np.nan, regime=REGIME_SUBSONIC, x_shock=np.nan,
+                    beta=np.nan, x_extended=np.nan, fan_alpha_tail=np.nan, fan_alpha_head=np.nan):
+        """Pack arrays into a FlowProfile. ``M`` and ``p`` are (n,) for one
+        profile or (k, n) for a batch; ``x`` and the scalars broadcast."""
+        M = np.asarray(M, dtype=float)
+        data = np.empty(M.shape[:-1], dtype=profile_dtype(M.shape[-1]))
+        data['x'] = x
+        data['M'] = M
+        data['p'] = p
+        data['pb_p0'] = pb_p0
+        data['regime'] = regime
+        data['x_shock'] = x_shock
+        data['beta'] = beta
+        data['x_extended'] = x_extended
+        data['fan_alpha_tail'] = fan_alpha_tail
+        data['fan_alpha_head'] = fan_alpha_head
+        return cls(data)
+
+    @classmethod
+    def from_viz_data(cls, x, M, p, viz_data, pb_p0=np.nan, regime=None):
+        """Build a FlowProfile from the ``(M_array, p_array, viz_data)`` returned
+        by Nozzle._calculate_flow_profile."""
+        if regime is None:
+            regime = (REGIME_NORMAL_SHOCK if viz_data["flag_draw_nshock"] else
+                      REGIME_OBLIQUE_SHOCK if viz_data["flag_draw_oshock"] else
+                      REGIME_EXPANSION_FAN if viz_data["flag_draw_fan"] else
+                      REGIME_SUBSONIC)
+        none_to_nan = lambda v: np.nan if v is None else v
+        fan_alphas = viz_data["fan_alphas"]
+        return cls.from_arrays(
+            x, M, p, pb_p0=pb_p0, regime=regime,
+            x_shock=none_to_nan(viz_data["x_shock"]),
+            beta=none_to_nan(viz_data["beta"]),
+            x_extended=none_to_nan(viz_data["x_extended"]),
+            fan_alpha_tail=np.nan if fan_alphas is None else fan_alphas[0],
+            fan_alpha_head=np.nan if fan_alphas is None else fan_alphas[-1],
+        )
+
+    @classmethod
+    def concatenate(cls, profiles):
+        """Join profiles on the same number of points into one batch."""
+        return cls(np.concatenate([np.atleast_1d(fp.data) for fp in profiles]))
+
+    def save(self, path):
+        """Write the backing array as a .npy file."""
+        np.save(path, self.data)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """Read a saved profile; ``mmap_mode='r'`` maps it without loading."""
+        return cls(np.load(path, mmap_mode=mmap_mode))
+
+    def __len__(self):
+        if self.data.ndim == 0:
+            raise TypeError("single FlowProfile has no len()")
+        return len(self.data)
+
+    def __getitem__(self, index):
+        return FlowProfile(self.data[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        n = self.data.dtype['M'].shape[0]
+        shape = "single" if self.data.ndim == 0 else f"{len(self.data)} profiles"
+        return f"FlowProfile({shape}, {n} points)"
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    @property
+    def x(self):
+        return self.data['x']
+
+    @property
+    def M(self):
+        return self.data['M']
+
+    @property
+    def p(self):
+        return self.data['p']
+
+    @property
+    def pb_p0(self):
+        return self.data['pb_p0']
+
+    @property
+    def regime(self):
+        return self.data['regime']
+
+    @property
+    def x_shock(self):
+        return self.data['x_shock']
+
+    @property
+    def beta(self):
+        return self.data['beta']
+
+    @property
+    def x_extended(self):
+        return self.data['x_extended']
+
+    @property
+    def fan_alphas(self):
+        """Expansion-fan line angles, tail -> head (NaN outside that regime)."""
+        return np.linspace(self.data['fan_alpha_tail'], self.data['fan_alpha_head'], N_FAN_LINES, axis=-1)
+
+    @property
+    def viz_data(self):
+        """Metadata of a single profile in the dict form used by the plotting code."""
+        if self.data.ndim != 0:
+            raise ValueError("viz_data is only defined for a single profile")
+        regime = int(self.data['regime'])
+        nan_to_none = lambda v: None if np.isnan(v) else float(v)
+        return {
+            "flag_draw_oshock": regime == REGIME_OBLIQUE_SHOCK,
+            "flag_draw_fan": regime == REGIME_EXPANSION_FAN,
+            "flag_draw_nshock": regime == REGIME_NORMAL_SHOCK,
+            "x_shock": nan_to_none(self.data['x_shock']),
+            "fan_alphas": self.fan_alphas if regime == REGIME_EXPANSION_FAN else None,
+            "beta": nan_to_none(self.data['beta']),
+            "x_extended": nan_to_none(self.data['x_extended']),
+        }
@@ -1,5 +1,22 @@
-from rocketisp.geometry import Geometry
 import numpy as np
+from functools import lru_cache
+
+# rocketisp Geometry parameters, in the order used as the cache key
+GEOMETRY_PARAM_NAMES = ('Rthrt', 'CR', 'eps', 'LnozInp', 'RupThroat', 'RdwnThroat',
+                        'RchmConv', 'cham_conv_deg', 'LchmOvrDt')
+
+# Default preset nozzle configuration (SSME)
+SSME_DEFAULT_PARAMS = {
+    'Rthrt': 5.1527,
+    'CR': 3.0,
+    'eps': 77.5,
+    'LnozInp': 121.0,
+    'RupThroat': 1.0,
+    'RdwnThroat': 0.392,
+    'RchmConv': 1.73921,
+    'cham_conv_deg': 25.42,
+    'LchmOvrDt': 2.4842/2
+}
 
 
 def get_A(G):
@@ -20,12 +37,51 @@ def get_A(G):
     
     # Create area function using numpy.interp
     A = lambda x: np.pi * (np.interp(x, z_sorted, r_sorted))**2
+    # contour nodes, so Nozzle can locate the throat exactly
+    A.breakpoints = z_sorted
     
     xmin = zL[0]
     xmax = zL[-1]
     return A, xmin, xmax
 
 
+def geometry_key(Rthrt, CR, eps, LnozInp, RupThroat, RdwnThroat, RchmConv, cham_conv_deg, LchmOvrDt):
+    """Normalized, hashable parameter tuple for a rocketisp geometry.
+
+    Values are rounded to 10 significant digits so that widget round-off
+    (e.g. 0.1 + 0.2 vs 0.3) maps to the same key.
+    """
+    values = (Rthrt, CR, eps, LnozInp, RupThroat, RdwnThroat, RchmConv, cham_conv_deg, LchmOvrDt)
+    return tuple(float(f"{float(v):.10g}") for v in values)
+
+
+@lru_cache(maxsize=64)
+def _get_A_for_key(key):
+    from rocketisp.geometry import Geometry  # deferred: rocketisp is slow to import
+    return get_A(Geometry(**dict(zip(GEOMETRY_PARAM_NAMES, key))))
+
+
+def get_cached_A(Rthrt, CR, eps, LnozInp, RupThroat, RdwnThroat, RchmConv, cham_conv_deg, LchmOvrDt):
+    """
+    Cached version of get_A(Geometry(...)) for rocketisp geometries.
+
+    Contours are memoized (least recently used first out, 64 entries) by the
+    normalized parameter tuple from geometry_key, so repeated or reverted
+    edits and gamma-only changes reuse the built Geometry, contour arrays
+    (A.breakpoints) and area function.
+
+    Returns:
+    --------
+    A, xmin, xmax : as returned by get_A
+    """
+    return _get_A_for_key(geometry_key(Rthrt, CR, eps, LnozInp, RupThroat, RdwnThroat,
+                                       RchmConv, cham_conv_deg, LchmOvrDt))
+
+
+get_cached_A.cache_info = _get_A_for_key.cache_info
+get_cached_A.cache_clear = _get_A_for_key.cache_clear
+
+
 def get_parabolic_A(a=1.5, b=0.6, c=0.25, xmin=0.0, xmax=1.0):
     """
     Create a simple parabolic area profile: A(x) = a*(x-b)^2 + c
@@ -53,4 +109,5 @@ def get_parabolic_A(a=1.5, b=0.6, c=0.25, xmin=0.0, xmax=1.0):
         Maximum x coordinate
     """
     A = lambda x: a * (x - b)**2 + c
+    A.breakpoints = np.array([b], dtype=float)  # vertex: the throat when a > 0
     return A, xmin, xmax
@@ -0,0 +1,88 @@
+"""Opt-in solver instrumentation: counters, phase timers and an event trace.
+
+Attach a Trace to a Nozzle to record where a solve spends its time::
+
+    trace = Trace()
+    nozzle = Nozzle(A, xmin, xmax, gamma, R, trace=trace)   # or nozzle.trace = trace
+    nozzle.plot_flow_profile_plotly(0.5)
+    trace.summary()      # {'timings': {'shock_location': ...}, 'counters': {...}}
+    trace.save('trace.json')
+
+Counters record root solves: calls, iterations and values solved by the
+vectorized area-Mach inversion, and calls, iterations and function
+evaluations of the scalar brentq solves. Phases are timed inclusively, so a
+phase nested in another also counts towards its parent. The exported
+events use the Chrome trace-event format (``ph: 'X'``, microseconds).
+
+With no trace attached (the default) the solver skips all bookkeeping.
+The only cost left is entering a shared no-op context per phase.
+"""
+import contextlib
+import json
+import threading
+import time
+from collections import defaultdict
+
+# Returned by Nozzle._phase when tracing is off
+NULL_PHASE = contextlib.nullcontext()
+
+
+class Trace(object):
+    """Collects counters, per-phase timings and timed events."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counters = defaultdict(int)
+        self.timings = defaultdict(float)
+        self.events = []
+        self._t0 = time.perf_counter()
+
+    def count(self, name, n=1):
+        """Add ``n`` to counter ``name``."""
+        with self._lock:
+            self.counters[name] += int(n)
+
+    def count_root(self, name, result):
+        """Record a scipy RootResults from ``brentq(..., full_output=True)``."""
+        with self._lock:
+            self.counters[f"{name}.calls"] += 1
+            self.counters[f"{name}.iterations"] += result.iterations
+            self.counters[f"{name}.function_calls"] += result.function_calls
+
+    @contextlib.contextmanager
+    def phase(self, name, **args):
+        """Time the enclosed block as phase ``name``; ``args`` go into its event."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.timings[name] += end - start
+                self.events.append({
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - self._t0) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": 0,
+                    "tid": threading.get_ident(),
+                    "args": args,
+                })
+
+    def summary(self):
+        """Counters and total seconds per phase as plain dicts."""
+        with self._lock:
+            return {"timings": dict(self.timings), "counters": dict(self.counters)}
+
+    def to_json(self):
+        """Event list (Chrome trace-event format) plus the summary, as a JSON string."""
+        with self._lock:
+            events = list(self.events)
+        return json.dumps({"traceEvents": events, **self.summary()})
+
+    def save(self, path):
+        with open(path, "w") as f:
+            f.write(self.to_json())
@@ -0,0 +1,210 @@
+"""Numeric kernels of the nozzle solver with an optional Numba backend.
+
+Two backends provide the same functions:
+
+- ``'numpy'``: vectorized NumPy, always available.
+- ``'numba'``: the same formulas compiled with Numba (elementwise kernels
+  as ufuncs, the area-Mach inversion as a per-element loop). It is only
+  available when numba is installed. Compiled code is cached on disk
+  (``cache=True``, next to this module or in ``NUMBA_CACHE_DIR``), so new
+  worker processes load it instead of paying the JIT warmup again.
+
+``'auto'`` picks numba when it is installed and numpy otherwise. The
+global default comes from the ``NOZZLE_BACKEND`` environment variable
+('numpy' if unset) and can be changed with ``set_backend``. A Nozzle can
+override it with ``Nozzle(..., backend='numba')``.
+"""
+import importlib.util
+import os
+import threading
+
+import numpy as np
+
+BACKEND_NAMES = ('numpy', 'numba')
+
+
+def area_mach_relation(m, gamma):
+    """A/A* at Mach number m."""
+    return np.sqrt((2/(gamma+1)*(1+(gamma-1)/2*m**2))**((gamma+1)/(gamma-1))/m**2)
+
+
+def isentropic_pressure_ratio(M, gamma):
+    """p/p0 for isentropic flow at Mach number M."""
+    return (1.0 + 0.5 * (gamma - 1.0) * M**2) ** (-gamma / (gamma - 1.0))
+
+
+def normal_shock_pressure_ratio(M1, gamma):
+    """Static pressure ratio p2/p1 across a normal shock."""
+    return 1 + 2 * gamma / (gamma + 1) * (M1**2 - 1)
+
+
+def normal_shock_mach(M1, gamma):
+    """Mach number behind a normal shock."""
+    return np.sqrt((1 + (gamma - 1) / 2 * M1**2) / (gamma * M1**2 - (gamma - 1) / 2))
+
+
+def entropy_jump_normal_shock(M1, gamma, R):
+    """Entropy rise s2 - s1 across a normal shock."""
+    cp = gamma * R / (gamma - 1.0)
+    pressure_ratio = 1 + (2 * gamma / (gamma + 1.0)) * (M1**2 - 1.0)
+    temp_ratio = pressure_ratio * (2 + (gamma - 1.0) * M1**2) / ((gamma + 1.0) * M1**2)
+    return cp * np.log(temp_ratio) - R * np.log(pressure_ratio)
+
+
+def invert_area_mach(log_r, subsonic, m0, gamma, xtol, rtol, maxiter):
+    """Solve log(A/A*)(M) = log_r by safeguarded Newton iteration.
+
+    Brackets are [0, 1] on the subsonic branch and [1, 20] on the
+    supersonic one. A Newton step that leaves the bracket (or is not
+    finite) is replaced by bisection.
+
+    Returns:
+        (M, iterations, bisection_steps)
+    """
+    lo = np.where(subsonic, 0.0, 1.0)
+    hi = np.where(subsonic, 1.0, 20.0)
+    k = (gamma + 1) / (2 * (gamma - 1))
+    m = np.clip(m0, lo + 1e-12, hi - 1e-12)
+
+    iterations = 0
+    bisections = 0
+    with np.errstate(all='ignore'):
+        for iterations in range(1, maxiter + 1):
+            c = 1 + (gamma - 1) / 2 * m**2
+            f = k * np.log(2 / (gamma + 1) * c) - np.log(m) - log_r
+            # A/A* falls with M on the subsonic branch and rises on the supersonic one
+            too_small = (f > 0) == subsonic
+            lo = np.where(too_small, m, lo)
+            hi = np.where(too_small, hi, m)
+            m_new = m - f * m * c / (m**2 - 1)
+            bad = ~np.isfinite(m_new) | (m_new < lo) | (m_new > hi)
+            m_new = np.where(bad, 0.5 * (lo + hi), m_new)
+            bisections += np.count_nonzero(bad)
+            step = np.abs(m_new - m)
+            m = m_new
+            if np.all((step <= xtol + rtol * m) | (f == 0)):
+                break
+    return m, iterations, bisections
+
+
+def _invert_area_mach_loop(log_r, subsonic, m0, gamma, xtol, rtol, maxiter):
+    """Per-element version of invert_area_mach for compilation (1-d inputs)."""
+    k = (gamma + 1) / (2 * (gamma - 1))
+    m = np.empty_like(log_r)
+    iterations = 0
+    bisections = 0
+    for i in range(log_r.size):
+        sub = subsonic[i]
+        lo = 0.0 if sub else 1.0
+        hi = 1.0 if sub else 20.0
+        mi = min(max(m0[i], lo + 1e-12), hi - 1e-12)
+        it = 0
+        for it in range(1, maxiter + 1):
+            c = 1 + (gamma - 1) / 2 * mi * mi
+            f = k * np.log(2 / (gamma + 1) * c) - np.log(mi) - log_r[i]
+            if (f > 0) == sub:
+                lo = mi
+            else:
+                hi = mi
+            den = mi * mi - 1
+            m_new = mi - f * mi * c / den if den != 0 else np.nan
+            if not np.isfinite(m_new) or m_new < lo or m_new > hi:
+                m_new = 0.5 * (lo + hi)
+                bisections += 1
+            step = abs(m_new - mi)
+            mi = m_new
+            if step <= xtol + rtol * mi or f == 0:
+                break
+        iterations = max(iterations, it)
+        m[i] = mi
+    return m, iterations, bisections
+
+
+class Backend(object):
+    """A named set of kernel functions (see the module functions for signatures)."""
+
+    def __init__(self, name, area_mach_relation, isentropic_pressure_ratio, normal_shock_pressure_ratio,
+                 normal_shock_mach, entropy_jump_normal_shock, invert_area_mach) -> None:
+        self.name = name
+        self.area_mach_relation = area_mach_relation
+        self.isentropic_pressure_ratio = isentropic_pressure_ratio
+        self.normal_shock_pressure_ratio = normal_shock_pressure_ratio
+        self.normal_shock_mach = normal_shock_mach
+        self.entropy_jump_normal_shock = entropy_jump_normal_shock
+        self.invert_area_mach = invert_area_mach
+
+    def __repr__(self):
+        return f"Backend({self.name!r})"
+
+
+def _build_numpy():
+    return Backend('numpy', area_mach_relation, isentropic_pressure_ratio, normal_shock_pressure_ratio,
+                   normal_shock_mach, entropy_jump_normal_shock, invert_area_mach)
+
+
+def _build_numba():
+    import numba
+
+    ufunc2 = numba.vectorize(['float64(float64, float64)'], cache=True)
+    ufunc3 = numba.vectorize(['float64(float64, float64, float64)'], cache=True)
+    loop = numba.njit(cache=True)(_invert_area_mach_loop)
+
+    def invert(log_r, subsonic, m0, gamma, xtol, rtol, maxiter):
+        log_r = np.asarray(log_r, dtype=np.float64)
+        shape = log_r.shape
+        m, iterations, bisections = loop(
+            np.ascontiguousarray(log_r).ravel(),
+            np.ascontiguousarray(np.broadcast_to(subsonic, shape)).ravel(),
+            np.ascontiguousarray(np.broadcast_to(m0, shape), dtype=np.float64).ravel(),
+            float(gamma), float(xtol), float(rtol), int(maxiter))
+        return m.reshape(shape), iterations, bisections
+
+    return Backend('numba', ufunc2(area_mach_relation), ufunc2(isentropic_pressure_ratio),
+                   ufunc2(normal_shock_pressure_ratio), ufunc2(normal_shock_mach),
+                   ufunc3(entropy_jump_normal_shock), invert)
+
+
+_BUILDERS = {'numpy': _build_numpy, 'numba': _build_numba}
+_backends = {}
+_lock = threading.Lock()
+_default = os.environ.get('NOZZLE_BACKEND', 'numpy')
+
+
+def numba_available():
+    return importlib.util.find_spec('numba') is not None
+
+
+def available_backends():
+    """Names of the backends that can be used in this environment."""
+    return tuple(name for name in BACKEND_NAMES if name != 'numba' or numba_available())
+
+
+def _resolve(name):
+    if name == 'auto':
+        return 'numba' if numba_available() else 'numpy'
+    if name not in BACKEND_NAMES:
+        raise ValueError(f"Unknown backend {name!r}; choose from {BACKEND_NAMES + ('auto',)}")
+    if name == 'numba' and not numba_available():
+        raise ImportError("The 'numba' backend needs numba installed (pip install numba)")
+    return name
+
+
+def get_backend(name=None):
+    """Backend by name ('numpy', 'numba' or 'auto'); None gives the global default.
+
+    A Backend instance is returned unchanged.
+    """
+    if isinstance(name, Backend):
+        return name
+    name = _resolve(_default if name is None else name)
+    with _lock:
+        if name not in _backends:
+            _backends[name] = _BUILDERS[name]()
+        return _backends[name]
+
+
+def set_backend(name):
+    """Set the global default backend used by Nozzles created without one."""
+    global _default
+    _resolve(name)
+    _default = name
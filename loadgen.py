@@ -0,0 +1,168 @@
+"""Local load generator for service.py.
+
+    python loadgen.py --spawn                      # start a service, load it, stop it
+    python loadgen.py --url http://127.0.0.1:8765 --concurrency 32 --requests 5000
+
+Each of ``--concurrency`` clients holds one keep-alive connection and
+sends /profile requests back to back. The pb/p0 of each request is drawn
+from ``--distinct`` values, so repeats exercise the response cache and,
+when they overlap in time, request coalescing. Prints throughput, latency
+percentiles and the server's /stats counters (``--json`` for a JSON report).
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+async def _request(reader, writer, host, method, path, body=b''):
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def fetch(host, port, method, path, body=b''):
+    """One request on a fresh connection; returns (status, body bytes)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return await _request(reader, writer, host, method, path, body)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, payloads, concurrency):
+    """Send ``payloads`` (encoded bodies) from ``concurrency`` clients.
+
+    Returns:
+        (latencies in seconds, error count, elapsed seconds)
+    """
+    queue = iter(payloads)
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for body in queue:  # shared iterator: each payload is sent once
+                t0 = time.perf_counter()
+                status, _ = await _request(reader, writer, host, 'POST', '/profile', body)
+                latencies.append(time.perf_counter() - t0)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return np.array(latencies), errors, time.perf_counter() - t0
+
+
+def make_payloads(args):
+    rng = np.random.default_rng(args.seed)
+    pb_values = np.linspace(0.01, 0.99, args.distinct)
+    base = {'geometry': args.geometry, 'gamma': args.gamma, 'n_points': args.n_points}
+    if args.reduce:
+        base['reduce'] = args.reduce
+    payloads = []
+    for _ in range(args.requests):
+        pb = rng.choice(pb_values, size=args.batch).tolist()
+        payloads.append(json.dumps({**base, 'pb_p0': pb if args.batch > 1 else pb[0]}).encode())
+    return payloads
+
+
+def spawn_service(args):
+    """Start service.py on a free port; returns (process, host, port)."""
+    cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'service.py'), '--port', '0']
+    if args.workers:
+        cmd += ['--workers', str(args.workers)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()  # "listening on http://host:port"
+    if not line.startswith('listening on '):
+        proc.kill()
+        raise RuntimeError(f"service failed to start: {line!r}")
+    url = urlsplit(line.split()[-1])
+    return proc, url.hostname, url.port
+
+
+def report(latencies, errors, elapsed, stats):
+    pct = np.percentile(latencies, [50, 90, 99]) * 1e3 if len(latencies) else [np.nan] * 3
+    return {
+        'requests': int(len(latencies)),
+        'errors': int(errors),
+        'elapsed_s': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_ms': {'p50': pct[0], 'p90': pct[1], 'p99': pct[2],
+                       'max': float(latencies.max() * 1e3) if len(latencies) else np.nan},
+        'server': stats,
+    }
+
+
+async def main_async(args):
+    proc = None
+    if args.spawn:
+        proc, host, port = spawn_service(args)
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    try:
+        payloads = make_payloads(args)
+        if args.warmup:
+            await run_load(host, port, payloads[:args.warmup], min(args.concurrency, args.warmup))
+        latencies, errors, elapsed = await run_load(host, port, payloads, args.concurrency)
+        _, stats = await fetch(host, port, 'GET', '/stats')
+        return report(latencies, errors, elapsed, json.loads(stats))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure service.py throughput and latency.")
+    parser.add_argument('--url', default='http://127.0.0.1:8765', help='service to load')
+    parser.add_argument('--spawn', action='store_true', help='start a local service on a free port instead')
+    parser.add_argument('--workers', type=int, default=None, help='solver threads of a spawned service')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients (default 16)')
+    parser.add_argument('--requests', type=int, default=2000, help='requests to send (default 2000)')
+    parser.add_argument('--warmup', type=int, default=0, help='requests sent before measuring')
+    parser.add_argument('--distinct', type=int, default=100, help='distinct pb/p0 values (default 100)')
+    parser.add_argument('--batch', type=int, default=1, help='pb/p0 values per request (default 1)')
+    parser.add_argument('--geometry', choices=('parabolic', 'ssme'), default='parabolic')
+    parser.add_argument('--gamma', type=float, default=1.4)
+    parser.add_argument('--n-points', type=int, default=1000)
+    parser.add_argument('--reduce', help='ask for reduced rows, e.g. exit,shock')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(main_async(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    lat = result['latency_ms']
+    print(f"{result['requests']} requests, {result['errors']} errors in {result['elapsed_s']:.2f} s: "
+          f"{result['throughput_rps']:.0f} req/s")
+    print(f"latency ms: p50 {lat['p50']:.2f}  p90 {lat['p90']:.2f}  p99 {lat['p99']:.2f}  max {lat['max']:.2f}")
+    server = result['server']
+    print("server: " + ", ".join(f"{k}={server.get(k, 0)}" for k in
+                                 ('requests', 'cache_hits', 'cache_misses', 'computed', 'coalesced', 'nozzles')))
+
+
+if __name__ == '__main__':
+    main()
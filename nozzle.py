@@ -1,29 +1,243 @@
+import copy
+import warnings
+
 import numpy as np
-import scipy
-import scipy.optimize
-from matplotlib import pyplot as plt
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import time
-from typing import Tuple, Optional
 
+import area_mach_tables
+import kernels
+from flow_profile import (FlowProfile, N_FAN_LINES, REGIME_SUBSONIC, REGIME_NORMAL_SHOCK,
+                          REGIME_OBLIQUE_SHOCK, REGIME_EXPANSION_FAN)
+from instrumentation import NULL_PHASE, Trace
 
-class Nozzle(object):
-    def __init__(self, Afunc, xmin, xmax, gamma, R) -> None:
+
+def _geometry_attribute(name):
+    """Read-only Nozzle attribute forwarded to its NozzleGeometry."""
+    return property(lambda self: getattr(self.geometry, name), doc=f"Same as geometry.{name}.")
+
+
+class NozzleGeometry(object):
+    """Gas-independent part of a nozzle: area function, grid, sampled areas and throat.
+
+    One instance can be shared by Nozzles for several gammas (see
+    Nozzle.from_geometry); its arrays are read-only and it is never
+    modified after construction (with_grid returns a new one).
+    """
+
+    def __init__(self, Afunc, xmin, xmax, n_points=1000, n_plume=100, grid='uniform') -> None:
+        """Parameters as for Nozzle."""
+        if grid not in ('uniform', 'adaptive'):
+            raise ValueError(f"grid must be 'uniform' or 'adaptive', got {grid!r}")
         self.A = Afunc
         self.xmin = xmin 
         self.xmax = xmax 
-        self.x = np.linspace(self.xmin,self.xmax,1000,endpoint=True)
-        self.xeval = np.hstack([self.x,np.linspace(self.xmax, self.xmax + 1.5*(self.xmax-self.xmin),100)[1:]])
-        self.area_array = self.A(self.x)
+        self.n_plume = n_plume
+        self.grid = grid
         self.area_exit = self.A(self.xmax)
-        self.x_throat = scipy.optimize.fmin(self.A, x0 = 0.5*(xmin+xmax),disp=False)[0]
+        self.x_throat = self._find_throat()
         self.area_throat = self.A(self.x_throat)
+        if grid == 'adaptive':
+            self._set_grid(self.clustered_grid(n_points))
+        else:
+            self._set_grid(np.linspace(self.xmin,self.xmax,n_points,endpoint=True))
+
+    def _find_throat(self, n_samples=2001):
+        """Location of the global minimum of A(x) on [xmin, xmax].
+
+        Area functions that carry ``breakpoints`` have their minimum at one of
+        them or at an end point, so it is found exactly: contours from
+        geometry.get_A are piecewise linear in radius between breakpoints, and
+        geometry.get_parabolic_A marks its vertex. Otherwise A is sampled
+        uniformly and the smallest sample is refined by bounded Brent
+        minimization between its neighbours.
+        """
+        breakpoints = getattr(self.A, 'breakpoints', None)
+        if breakpoints is not None:
+            xb = np.asarray(breakpoints, dtype=float)
+            xb = np.concatenate([xb[(xb > self.xmin) & (xb < self.xmax)], [self.xmin, self.xmax]])
+            return float(xb[np.argmin(self.A(xb))])
+
+        xs = np.linspace(self.xmin, self.xmax, n_samples)
+        i = int(np.argmin(self.A(xs)))
+        lo, hi = xs[max(i - 1, 0)], xs[min(i + 1, n_samples - 1)]
+        from scipy.optimize import minimize_scalar  # deferred: keeps `import nozzle` light
+        res = minimize_scalar(self.A, bounds=(lo, hi), method='bounded',
+                              options={'xatol': 1e-12 * (self.xmax - self.xmin)})
+        return float(res.x) if self.A(res.x) <= self.A(xs[i]) else float(xs[i])
+
+    def _set_grid(self, x):
+        """Use the nozzle points ``x`` (sorted, from xmin to xmax) and rebuild the
+        plume points and sampled areas."""
+        self.x = np.array(x, dtype=float)
+        self.xeval = np.hstack([self.x,np.linspace(self.xmax, self.xmax + 1.5*(self.xmax-self.xmin),self.n_plume)[1:]])
+        self.area_array = self.A(self.x)
         self.area_array_before_throat = self.area_array[self.x<=self.x_throat]
         self.area_array_after_throat = self.area_array[self.x>=self.x_throat]
-        self.g = gamma
+        for array in (self.x, self.xeval, self.area_array,
+                      self.area_array_before_throat, self.area_array_after_throat):
+            array.flags.writeable = False
+
+    def with_grid(self, x):
+        """Copy of this geometry on the nozzle points ``x``; area function,
+        throat and exit area are shared."""
+        geometry = copy.copy(self)
+        geometry._set_grid(x)
+        return geometry
+
+    def clustered_grid(self, n_points, x_shock=None, n_samples=None):
+        """Nozzle grid of ``n_points`` clustered near the throat, steep area
+        gradients and, if given, a shock location.
+
+        Points equidistribute the monitor function
+        w(x) = 1 + 3*|dA/dx|/max|dA/dx| + 0.5*(|x - x_throat|/L)^(-3/4) + 5*G_shock(x),
+        where G_shock is a Gaussian of width 1% of the length L. The throat term
+        grades the spacing for the sqrt(|x - x_throat|) behaviour of M at a
+        sonic throat with a corner, as in piecewise-linear contours.
+        """
+        L = self.xmax - self.xmin
+        xs = np.linspace(self.xmin, self.xmax, n_samples or max(20 * n_points, 2000))
+        d = L * np.geomspace(1e-9, 1.0, 400)
+        xs = np.unique(np.clip(np.concatenate([xs, self.x_throat - d, self.x_throat + d]), self.xmin, self.xmax))
+        dA = np.abs(np.gradient(self.A(xs), xs))
+        w = 1 + 3 * dA / max(dA.max(), 1e-300)
+        w += 0.5 * (np.abs(xs - self.x_throat) / L + 1e-9) ** -0.75
+        if x_shock is not None:
+            w += 5 * np.exp(-0.5 * ((xs - x_shock) / (0.01 * L)) ** 2)
+        W = np.concatenate([[0.0], np.cumsum(0.5 * (w[1:] + w[:-1]) * np.diff(xs))])
+        x = np.interp(np.linspace(0.0, W[-1], n_points), W, xs)
+        x[0], x[-1] = self.xmin, self.xmax
+        return x
+
+
+class Nozzle(object):
+    def __init__(self, Afunc, xmin, xmax, gamma, R, n_points=1000, n_plume=100, grid='uniform',
+                 trace=None, backend=None) -> None:
+        """
+        Parameters:
+        -----------
+        n_points : int
+            Number of axial grid points inside the nozzle
+        n_plume : int
+            Number of points in the plume region past the exit (including the exit)
+        grid : str
+            'uniform' for equally spaced points, 'adaptive' to cluster them near
+            the throat and steep area gradients (see clustered_grid/refine_grid)
+        trace : Trace or bool, optional
+            Record root-solve counters and phase timings (see instrumentation).
+            True creates a new Trace; None/False (default) records nothing.
+        backend : str, optional
+            Numeric kernel backend: 'numpy', 'numba' or 'auto' (see kernels).
+            None uses the global default (kernels.set_backend).
+
+        The geometry-derived state (grid, areas, throat) is kept in
+        ``self.geometry``, a NozzleGeometry; the Nozzle itself only holds the
+        gas (gamma, R), the critical pressure ratios and cached solutions.
+        Use from_geometry or with_gas for other gammas on the same geometry.
+        """
+        self._init_flow(NozzleGeometry(Afunc, xmin, xmax, n_points=n_points, n_plume=n_plume, grid=grid),
+                        gamma, R, trace, backend)
+
+    def _init_flow(self, geometry, gamma, R, trace, backend):
+        self.trace = Trace() if trace is True else (trace or None)
+        self.kernels = kernels.get_backend(backend)
+        self.geometry = geometry
+        self._choked_solution = None
         self.R = R
+        self.g = gamma  # also computes the critical pressure ratios
+
+    @classmethod
+    def from_geometry(cls, geometry, gamma, R, trace=None, backend=None):
+        """Nozzle for ``gamma`` and ``R`` on an existing NozzleGeometry.
+
+        The geometry is shared, not copied, so this only solves the critical
+        pressure ratios.
+        """
+        nozzle = cls.__new__(cls)
+        nozzle._init_flow(geometry, gamma, R, trace, backend)
+        return nozzle
+
+    def with_gas(self, gamma, R=None):
+        """Nozzle on the same (shared) geometry and backend for another gamma and R."""
+        return type(self).from_geometry(self.geometry, gamma, self.R if R is None else R, backend=self.kernels)
+
+    A = _geometry_attribute('A')
+    xmin = _geometry_attribute('xmin')
+    xmax = _geometry_attribute('xmax')
+    n_plume = _geometry_attribute('n_plume')
+    grid = _geometry_attribute('grid')
+    x_throat = _geometry_attribute('x_throat')
+    x = _geometry_attribute('x')
+    xeval = _geometry_attribute('xeval')
+    area_array = _geometry_attribute('area_array')
+    area_array_before_throat = _geometry_attribute('area_array_before_throat')
+    area_array_after_throat = _geometry_attribute('area_array_after_throat')
+
+    def _phase(self, name, **args):
+        """Context manager timing ``name`` on self.trace (a no-op without one)."""
+        if self.trace is None:
+            return NULL_PHASE
+        return self.trace.phase(name, **args)
+
+    def _set_grid(self, x):
+        """Switch to the nozzle points ``x`` (on a new geometry; a shared one is
+        left alone)."""
+        self.geometry = self.geometry.with_grid(x)
+        self._choked_solution = None
+
+    def clustered_grid(self, n_points, x_shock=None, n_samples=None):
+        """See NozzleGeometry.clustered_grid."""
+        return self.geometry.clustered_grid(n_points, x_shock=x_shock, n_samples=n_samples)
+
+    def refine_grid(self, pb_p0_ratio, tol=1e-4, n_start=100, n_max=16000):
+        """Refine a clustered grid for ``pb_p0_ratio`` until the answer converges.
+
+        The point count is doubled, re-clustering around the latest shock, until
+        the changes in exit pressure, shock location (relative to the nozzle
+        length) and the p/p0 profile (previous grid interpolated onto the new
+        one, away from the shock) are all below ``tol``, or ``n_max`` is reached
+        (with a RuntimeWarning). The nozzle keeps the final grid.
+
+        Exit pressure and shock location are solved from the exit plane and do
+        not depend on the grid, so in practice the p/p0 profile criterion
+        alone decides when to stop.
+
+        Returns:
+            (M_array, p_array, viz_data) on the final grid
+        """
+        L = self.xmax - self.xmin
+        n = n_start
+        prev = None
+        while True:
+            x_shock = prev[2]["x_shock"] if prev is not None else None
+            self._set_grid(self.clustered_grid(n, x_shock=x_shock))
+            M_array, p_array, viz_data = self._calculate_flow_profile(pb_p0_ratio)
+            if prev is not None:
+                x_prev, p_prev, viz_prev = prev
+                k = len(self.x)
+                p_interp = np.interp(self.x, x_prev, p_prev)
+                keep = np.ones(k, dtype=bool)
+                err = abs(p_array[k - 1] - p_prev[-1])
+                if viz_data["x_shock"] is not None:
+                    # the jump itself is not a grid error: skip the coarse cells around it
+                    h = np.max(np.diff(x_prev))
+                    keep = np.abs(self.x - viz_data["x_shock"]) > h
+                    err = max(err, abs(viz_data["x_shock"] - (viz_prev["x_shock"] or 0.0)) / L)
+                err = max(err, np.max(np.abs(p_interp - p_array[:k])[keep]))
+                if err <= tol:
+                    break
+            if 2 * n > n_max:
+                warnings.warn(f"refine_grid: not converged to tol={tol:g} at n_max={n_max} points "
+                              f"(pb/p0={pb_p0_ratio:g})", RuntimeWarning, stacklevel=2)
+                break
+            prev = (self.x, p_array[:len(self.x)], viz_data)
+            n *= 2
+        return M_array, p_array, viz_data
 
+    def _compute_critical_pressure_ratios(self):
+        with self._phase('critical_ratios'):
+            self._solve_critical_pressure_ratios()
+
+    def _solve_critical_pressure_ratios(self):
+        gamma = self.g
         # compute critical pressures 1-2-3
         # Critical case pressure ratio(s) for Case 1 
         ratio = self.get_exit_area_over_throat()
@@ -35,7 +249,7 @@ class Nozzle(object):
         m_crit_2 = self.solve_mach_number_from_area_ratio(ratio=ratio, gamma=gamma, is_subsonic=False)
         p0_pe = (1+(gamma-1)/2*m_crit_2**2)**(gamma/(gamma-1))
         # normal shock
-        p_ns_ratio = 1 + 2*gamma/(gamma+1)*(m_crit_2**2-1)
+        p_ns_ratio = self.kernels.normal_shock_pressure_ratio(m_crit_2, gamma)
         self.crit_p_ratio_2 = p_ns_ratio/p0_pe
 
         # Critical case pressure ratio(s) for Case 3 - shockfree
@@ -44,8 +258,47 @@ class Nozzle(object):
     @classmethod
     def area_mach_relation(cls, m, gamma):
         """area mach number relation"""
-        A_over_A_throat = np.sqrt((2/(gamma+1)*(1+(gamma-1)/2*m**2))**((gamma+1)/(gamma-1))/m**2)
-        return A_over_A_throat
+        return kernels.get_backend().area_mach_relation(m, gamma)
+
+    @classmethod
+    def isentropic_pressure_ratio(cls, M, gamma):
+        """p/p0 for isentropic flow at Mach number M."""
+        return kernels.get_backend().isentropic_pressure_ratio(M, gamma)
+
+    @classmethod
+    def solve_mach_numbers_from_area_ratios(cls, ratios, gamma, is_subsonic=True,
+                                            xtol=1e-7, rtol=1e-7, maxiter=100, m0=None, trace=None,
+                                            backend=None):
+        """Invert the area-Mach relation for a whole array of A/A* at once.
+
+        Uses a bracketed Newton iteration on log(A/A*) with a bisection
+        fallback, on the same brackets as the scalar solver: [0, 1] for the
+        subsonic branch and [1, 20] for the supersonic branch.
+        ``is_subsonic`` may be a bool or a boolean array broadcastable to
+        ``ratios``. Ratios slightly below 1 (round-off around the throat)
+        return M = 1. The iteration starts from ``m0`` if given, otherwise
+        from the gamma-keyed inverse table in ``area_mach_tables``. A ``trace``
+        (instrumentation.Trace) counts calls, values, iterations and bisection
+        fallback steps under 'area_mach.*'. ``backend`` selects the kernel
+        backend (see kernels.get_backend; default: the global one).
+        """
+        ratios = np.asarray(ratios, dtype=float)
+        subsonic = np.broadcast_to(np.asarray(is_subsonic, dtype=bool), ratios.shape)
+        if np.any(~subsonic & (ratios > kernels.area_mach_relation(20.0, gamma))):
+            raise ValueError("Area ratio outside the supersonic bracket M in [1, 20]")
+        log_r = np.log(np.maximum(ratios, 1.0))
+
+        if m0 is None:
+            # interpolated guess from the cached inverse table for this gamma
+            m0 = area_mach_tables.lookup(ratios, gamma, subsonic)
+        m, iterations, bisections = kernels.get_backend(backend).invert_area_mach(
+            log_r, subsonic, m0, gamma, xtol, rtol, maxiter)
+        if trace is not None:
+            trace.count('area_mach.calls')
+            trace.count('area_mach.values', m.size)
+            trace.count('area_mach.iterations', iterations)
+            trace.count('area_mach.bisection_steps', bisections)
+        return m
     
     @classmethod
     def prandtl_meyer(cls, M, gamma):
@@ -64,10 +317,7 @@ class Nozzle(object):
     # entropy rise across a normal shock as a function of M1
     @classmethod
     def entropy_jump_normal_shock(cls, M1, gamma, R):
-        cp = gamma * R / (gamma - 1.0)
-        pressure_ratio = 1 + (2 * gamma / (gamma + 1.0)) * (M1**2 - 1.0)
-        temp_ratio = pressure_ratio * (2 + (gamma - 1.0) * M1**2) / ((gamma + 1.0) * M1**2)
-        return cp * np.log(temp_ratio) - R * np.log(pressure_ratio)
+        return kernels.get_backend().entropy_jump_normal_shock(M1, gamma, R)
 
     def _calculate_flow_profile(self, pb_p0_ratio):
         """Compute M(x) and p/p0(x) for the given back-pressure ratio.
@@ -78,198 +328,83 @@ class Nozzle(object):
         if pb_p0_ratio <= 0 or pb_p0_ratio > 1:
             raise ValueError(f"Pressure ratio must be between 0 and 1, got {pb_p0_ratio}")
 
-        flag_draw_oshock = False 
-        flag_draw_fan = False
-        flag_draw_nshock = False  # Normal shock inside nozzle
-        fan_alphas = None
-        beta = None
-        x_extended = None
-        x_shock = None  # Location of normal shock
-
-        if pb_p0_ratio > self.crit_p_ratio_1:
-            # Subsonic throat
-            p0_pb = 1.0 / pb_p0_ratio
-            m_exit = np.sqrt((p0_pb ** ((self.g - 1) / (self.g)) - 1) * 2 / (self.g - 1))
-            Ae_over_A_star = self.area_mach_relation(m_exit, self.g)
-            A_over_A_star = self.area_array / self.area_exit * Ae_over_A_star
-
-            M_array = np.zeros_like(self.xeval)
-            p_array = np.zeros_like(self.xeval)
-            
-            for i in range(len(self.xeval)):
-                if i < len(A_over_A_star):
-                    ratio = A_over_A_star[i]
-                    M_array[i] = self.solve_mach_number_from_area_ratio(ratio, self.g, is_subsonic=True)
-                    p_array[i] = (1.0 + 0.5 * (self.g - 1.0) * M_array[i] ** 2) ** (-self.g / (self.g - 1.0))
-                else:
-                    M_array[i] = M_array[len(A_over_A_star) - 1]
-                    p_array[i] = p_array[len(A_over_A_star) - 1]
-            
-        elif pb_p0_ratio > self.crit_p_ratio_2:
-            # Sonic throat with normal shock inside expansion
-            def M_and_p_given_x_shock(x_shock):
-                last_index_before_shock = np.where(self.x < x_shock)[0][-1]
+        with self._phase('flow_profile', pb_p0=float(pb_p0_ratio)):
+            flag_draw_oshock = False 
+            flag_draw_fan = False
+            flag_draw_nshock = False  # Normal shock inside nozzle
+            fan_alphas = None
+            beta = None
+            x_extended = None
+            x_shock = None  # Location of normal shock
+
+            if pb_p0_ratio > self.crit_p_ratio_1:
+                # Subsonic throat
+                p0_pb = 1.0 / pb_p0_ratio
+                m_exit = np.sqrt((p0_pb ** ((self.g - 1) / (self.g)) - 1) * 2 / (self.g - 1))
+                with np.errstate(divide='ignore'):  # pb/p0 = 1: no flow, A/A* -> inf, M -> 0
+                    Ae_over_A_star = self.kernels.area_mach_relation(m_exit, self.g)
+                A_over_A_star = self.area_array / self.area_exit * Ae_over_A_star
+
                 M_array = np.zeros_like(self.xeval)
                 p_array = np.zeros_like(self.xeval)
-                A_over_A_star = self.area_array / self.area_throat 
-
-                for i in range(len(self.xeval)):
-                    if i < len(self.x):
-                        ratio = A_over_A_star[i]
-                        
-                        if self.x[i] < self.x_throat:
-                            M_array[i] = self.solve_mach_number_from_area_ratio(ratio, self.g, is_subsonic=True)
-                            p_array[i] = 1 / (1 + (self.g - 1) / 2 * M_array[i] ** 2) ** (self.g / (self.g - 1))
-                        elif self.x[i] < x_shock:
-                            M_array[i] = self.solve_mach_number_from_area_ratio(ratio, self.g, is_subsonic=False)
-                            p_array[i] = 1 / (1 + (self.g - 1) / 2 * M_array[i] ** 2) ** (self.g / (self.g - 1))
-                        else:
-                            M1 = M_array[last_index_before_shock]
-                            delta_s = self.entropy_jump_normal_shock(M1, self.g, R=self.R)
-                            p0_new_p0 = np.exp(-delta_s / self.R)
-                            M2 = np.sqrt((1 + (self.g - 1) / 2 * M1 ** 2) / (self.g * M1 ** 2 - (self.g - 1) / 2))
-    
-                            A_over_A_shock = ratio * self.area_throat / self.get_area(self.x[last_index_before_shock + 1])
-                            A_shock_over_A_star = self.area_mach_relation(M2, self.g)
-                            A_over_A_star_tmp = A_over_A_shock * A_shock_over_A_star
-    
-                            M_array[i] = self.solve_mach_number_from_area_ratio(A_over_A_star_tmp, self.g, is_subsonic=True)
-                            p_array[i] = p0_new_p0 * (1 + (self.g - 1) / 2 * M_array[i] ** 2) ** (-self.g / (self.g - 1))
-                    else:
-                        M_array[i] = M_array[len(self.x) - 1]
-                        p_array[i] = p_array[len(self.x) - 1]
-                return M_array, p_array
-
-            mismatch_predicted_exit_pressure = lambda x_shock: M_and_p_given_x_shock(x_shock)[1][len(self.x) - 1] - pb_p0_ratio
-            x_shock = scipy.optimize.root_scalar(
-                mismatch_predicted_exit_pressure,
-                                                 bracket=[self.x_throat, self.xmax], 
-                method="brentq",
-                maxiter=1000,
-                xtol=1e-7,
-                rtol=1e-7,
-            ).root
-            M_array, p_array = M_and_p_given_x_shock(x_shock)
-            flag_draw_nshock = True  # Mark for drawing normal shock
-
-        elif pb_p0_ratio > self.crit_p_ratio_3:
-            # Sonic throat - oblique shock at exit
-            flag_draw_oshock = True
+                n = len(A_over_A_star)
+                with self._phase('interior'):
+                    M_array[:n] = self.solve_mach_numbers_from_area_ratios(A_over_A_star, self.g, is_subsonic=True,
+                                                                           trace=self.trace, backend=self.kernels)
+                    p_array[:n] = self.kernels.isentropic_pressure_ratio(M_array[:n], self.g)
+                M_array[n:] = M_array[n - 1]
+                p_array[n:] = p_array[n - 1]
             
-            M_array = np.zeros_like(self.xeval)
-            p_array = np.zeros_like(self.xeval)
-            A_over_A_star = self.area_array / self.area_throat 
-            r_exit = np.sqrt(self.area_array / np.pi)[-1]
-            
-            for i in range(len(self.xeval)):
-                if i < len(self.x):
-                    ratio = A_over_A_star[i]
-                    if self.x[i] < self.x_throat:
-                        M_array[i] = self.solve_mach_number_from_area_ratio(ratio, self.g, is_subsonic=True)
-                        p_array[i] = 1 / (1 + (self.g - 1) / 2 * M_array[i] ** 2) ** (self.g / (self.g - 1))
-                    else:
-                        M_array[i] = self.solve_mach_number_from_area_ratio(ratio, self.g, is_subsonic=False)
-                        p_array[i] = 1 / (1 + (self.g - 1) / 2 * M_array[i] ** 2) ** (self.g / (self.g - 1))
-                elif i == len(self.x):
-                    M_exit = M_array[len(self.x) - 1]
-                    p_exit = p_array[len(self.x) - 1]
-                    pb_pe = pb_p0_ratio / p_exit
-                    Mn1 = np.sqrt((pb_pe - 1) * (self.g + 1) / (self.g * 2) + 1)
-                    Mn2 = np.sqrt((1 + (self.g - 1) / 2 * Mn1 ** 2) / (self.g * Mn1 ** 2 - (self.g - 1) / 2))
-                    beta = np.arcsin(Mn1 / M_exit)
-                    tan_theta = (
-                        2
-                        / np.tan(beta)
-                        * (M_exit**2 * np.sin(beta) ** 2 - 1)
-                        / (M_exit**2 * (self.g + np.cos(2 * beta)) + 2)
-                    )
-                    theta = np.arctan(tan_theta)
-                    x_extended = self.xmax + r_exit / np.tan(beta)
-                    M_array[i] = M_exit
-                    p_array[i] = p_exit   
-                elif x_extended is not None and self.xeval[i] >= x_extended:
-                    # beta/theta must have been computed at i == len(self.x)
-                    M_array[i] = Mn2 / np.sin(beta - theta)
-                    p_array[i] = pb_p0_ratio
-                else:
-                    M_array[i] = M_array[len(self.x) - 1]
-                    p_array[i] = p_array[len(self.x) - 1]
+            elif pb_p0_ratio > self.crit_p_ratio_2:
+                # Sonic throat with normal shock inside expansion
+                x_shock, p0_new_p0 = self._solve_normal_shock_location(pb_p0_ratio)
+                M_array = np.zeros_like(self.xeval)
+                p_array = np.zeros_like(self.xeval)
+                A_over_A_star = self.area_array / self.area_throat
+                n = len(self.x)
 
-        else:
-            # Underexpanded jet - expansion fan
-            g = self.g
-            M_array = np.zeros_like(self.xeval)
-            p_array = np.zeros_like(self.xeval)
-            A_over_A_star = self.area_array / self.area_throat
-        
-            def p_over_p0(M):
-                return (1.0 + 0.5 * (g - 1.0) * M**2) ** (-g / (g - 1.0))
-        
-            # nozzle interior (isentropic, choked)
-            for i in range(len(self.x)):
-                ratio = A_over_A_star[i]
-                if self.x[i] < self.x_throat:
-                    M = self.solve_mach_number_from_area_ratio(ratio, g, is_subsonic=True)
-                else:
-                    M = self.solve_mach_number_from_area_ratio(ratio, g, is_subsonic=False)
-        
-                M_array[i] = M
-                p_array[i] = p_over_p0(M)
-        
-            # exit state
-            i_exit = len(self.x) - 1
-            M_exit = M_array[i_exit]
-            p_exit = p_array[i_exit]  # pe/p0
-        
-            # far-field Mach matching pb/p0 (isentropic inversion)
-            M_far = np.sqrt((2.0 / (g - 1.0)) * (pb_p0_ratio ** (-(g - 1.0) / g) - 1.0))
-        
-            x_exit = self.xmax
-            r_exit = np.sqrt(self.area_exit / np.pi)
-        
-            mu_exit = np.arcsin(np.clip(1.0 / M_exit, 0.0, 1.0))  # head (at exit state)
-            mu_far = np.arcsin(np.clip(1.0 / M_far, 0.0, 1.0))  # tail (fully expanded)
-        
-            x_head = x_exit + r_exit / np.tan(mu_exit)
-            x_tail = x_exit + r_exit / np.tan(mu_far)
-        
-            x_end = self.xeval[-1]
-            x_tail_eff = min(x_tail, x_end)
-        
-            def is_hit_by_fan_centerline(xq):
-                return (xq >= x_head) and (xq <= x_tail_eff)
-        
-            # fill extended region using fan theory on centerline
-            for i in range(len(self.x), len(self.xeval)):
-                xq = self.xeval[i]
-        
-                if xq < x_head:
-                    M = M_exit
-                    p = p_exit
-                elif is_hit_by_fan_centerline(xq):
-                    dx = max(xq - x_exit, 1e-12)
-                    mu = np.arctan(r_exit / dx)
-                    mu = np.clip(mu, mu_far, mu_exit)
-                    M = 1.0 / np.sin(mu)
-                    M = float(np.clip(M, M_exit, M_far))
-                    p = p_over_p0(M)
-                else:
-                    if x_tail <= x_end:
-                        M = M_far
-                        p = pb_p0_ratio
-                    else:
-                        M = M_array[i - 1]
-                        p = p_array[i - 1]
-        
-                M_array[i] = M
-                p_array[i] = p
-        
-            if x_tail <= x_end:
-                M_array[-1] = M_far
-                p_array[-1] = pb_p0_ratio
+                # isentropic part up to the shock
+                M_array[:n], p_array[:n] = self.choked_solution
+
+                # subsonic flow behind the shock; A* grows by the stagnation pressure loss
+                downstream = self.x >= x_shock
+                with self._phase('interior'):
+                    M_array[:n][downstream] = self.solve_mach_numbers_from_area_ratios(
+                        A_over_A_star[downstream] * p0_new_p0, self.g, is_subsonic=True,
+                        trace=self.trace, backend=self.kernels)
+                    p_array[:n][downstream] = p0_new_p0 * self.kernels.isentropic_pressure_ratio(M_array[:n][downstream], self.g)
+
+                M_array[n:] = M_array[n - 1]
+                p_array[n:] = p_array[n - 1]
+                flag_draw_nshock = True  # Mark for drawing normal shock
+
+            elif pb_p0_ratio > self.crit_p_ratio_3:
+                # Sonic throat - oblique shock at exit
+                flag_draw_oshock = True
+            
+                M_array = np.zeros_like(self.xeval)
+                p_array = np.zeros_like(self.xeval)
+                n = len(self.x)
+                M_array[:n], p_array[:n] = self.choked_solution
+                with self._phase('plume'):
+                    M_plume, p_plume, beta, x_extended = self._oblique_shock_plume(
+                        M_array[n - 1], p_array[n - 1], [pb_p0_ratio])
+                M_array[n:], p_array[n:] = M_plume[0], p_plume[0]
+                beta, x_extended = beta[0], x_extended[0]
 
-            flag_draw_fan = True
-            fan_alphas = np.linspace(mu_far, mu_exit, 7)  # tail -> head
+            else:
+                # Underexpanded jet - expansion fan
+                flag_draw_fan = True
+                M_array = np.zeros_like(self.xeval)
+                p_array = np.zeros_like(self.xeval)
+                # nozzle interior (isentropic, choked), then centerline through the fan
+                n = len(self.x)
+                M_array[:n], p_array[:n] = self.choked_solution
+                with self._phase('plume'):
+                    M_plume, p_plume, fan_alphas = self._expansion_fan_plume(
+                        M_array[n - 1], p_array[n - 1], [pb_p0_ratio])
+                M_array[n:], p_array[n:] = M_plume[0], p_plume[0]
+                fan_alphas = fan_alphas[0]  # tail -> head
 
         viz_data = {
             "flag_draw_oshock": flag_draw_oshock,
@@ -283,325 +418,286 @@ class Nozzle(object):
         return M_array, p_array, viz_data
 
 
-    def plot_flow_profile(self, pb_p0_ratio):
-        """Plot flow profile using matplotlib."""
-        M_array, p_array, viz_data = self._calculate_flow_profile(pb_p0_ratio)
-        flag_draw_oshock = viz_data['flag_draw_oshock']
-        flag_draw_fan = viz_data['flag_draw_fan']
-        fan_alphas = viz_data['fan_alphas']
-        beta = viz_data['beta']
-        
-        # start to draw
-        fig, ax1 = plt.subplots(figsize=(12, 6))
-        fig.patch.set_facecolor('white')
-        ax1.set_facecolor('white')
-
-        # Plot M(x) and p/p0(x) on primary axis
-        ax1.plot(self.xeval, M_array, color='green', linewidth=2, label='$M(x)$')
-        ax1.plot(self.xeval, p_array, color='orange', linestyle='--', linewidth=2, label=r'$p/p_0(x)$')
-        
-        ax1.set_xlabel('Axial Position $x$', fontsize=12)
-        ax1.set_ylabel('Mach Number / Pressure Ratio', fontsize=12)
-        ax1.set_xlim([min(self.xeval), max(self.xeval)])
-        ax1.set_ylim([0, 5])
-        ax1.grid(True, alpha=0.3)
-        
-        # Create secondary axis for area
-        ax2 = ax1.twinx()
-        ax2.set_facecolor('white')
-        
-        # Plot area on secondary axis
-        ax2.plot(self.x, np.sqrt(self.area_array/np.pi), color='black', linewidth=2, label='$A(x)$')
-        if flag_draw_oshock:
-            r = 2*np.linspace(0, self.xmax - self.xmin, 5)
-            ray_x = r*np.cos(-beta)
-            ray_y = r*np.sin(-beta)
-            x_arr = self.x[-1] + ray_x
-            y_arr = np.sqrt(self.area_array/np.pi)[-1] + ray_y
-            x_arr_2 = 0.01*(self.xmax - self.xmin)+self.x[-1] + ray_x
-            y_arr_2 = 0.01*(max(np.sqrt(self.area_array/np.pi))-min(np.sqrt(self.area_array/np.pi))) + np.sqrt(self.area_array/np.pi)[-1] + ray_y
-            ax2.plot(x_arr, y_arr, color='red', lw=2, label=f'shockwave (beta={beta*180/np.pi:.3f}°)')
-            ax2.plot(x_arr_2, y_arr_2, color='red', lw=2)
-            
-        if flag_draw_fan and (fan_alphas is not None):
-            x0 = self.x[-1]          # exit x
-            r_exit = np.sqrt(self.area_array/np.pi)[-1]
-            y0 = r_exit              # exit radius
-            x_end = max(self.xeval)  # draw up to end of your extended domain
-        
-            for j, a in enumerate(fan_alphas):
-                # line from (x0,y0) with downward slope toward centerline
-                y_at_end = y0 - (x_end - x0) * np.tan(a)
-        
-                if y_at_end <= 0.0:
-                    # it hits the centerline before x_end
-                    x_hit = x0 + y0 / np.tan(a)
-                    xs = np.array([x0, x_hit])
-                    ys = np.array([y0, 0.0])
-                else:
-                    # it doesn't reach centerline within plotting window
-                    xs = np.array([x0, x_end])
-                    ys = np.array([y0, y_at_end])
-        
-                ax2.plot(xs, ys, linestyle="--", linewidth=1.5, color="blue",
-                         label="expansion fan" if j == 0 else None)
-        
-        ax2.set_ylabel('Radius', fontsize=12, color='black')
-        ax2.set_ylim([0,max(np.sqrt(self.area_array/np.pi))*1.1])
-        ax2.tick_params(axis='y', labelcolor='black')
-        
-        # Combine legends
-        lines1, labels1 = ax1.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax1.legend(lines1 + lines2, labels1 + labels2,
-                   loc='upper center',
-                   bbox_to_anchor=(0.5, -0.15),  # Below the plot
-                   ncol=4,
-                   fontsize=10,
-                   frameon=False)
-        # Use try-except to handle potential tight_layout issues with mathtext
-        try:
-            plt.tight_layout(rect=[0, 0.1, 1, 1])
-        except (ValueError, Exception):
-            # If tight_layout fails, use a simpler layout adjustment
-            plt.tight_layout()
-        
-        return fig
+    def _solve_normal_shock_location(self, pb_p0_ratio):
+        """Locate the normal shock that matches the exit pressure to pb/p0.
 
-    def plot_flow_profile_plotly(self, pb_p0_ratio):
-        """Create Plotly figure for flow profile."""
-        try:
-            M_array, p_array, viz_data = self._calculate_flow_profile(pb_p0_ratio)
-            flag_draw_oshock = viz_data["flag_draw_oshock"]
-            flag_draw_fan = viz_data["flag_draw_fan"]
-            flag_draw_nshock = viz_data["flag_draw_nshock"]
-            x_shock = viz_data["x_shock"]
-            fan_alphas = viz_data["fan_alphas"]
-            beta = viz_data["beta"]
-        except (ValueError, ZeroDivisionError, OverflowError) as e:
-            raise ValueError(f"Numerical error in flow calculation: {str(e)}")
-        except Exception as e:
-            raise RuntimeError(f"Unexpected error in flow calculation: {str(e)}")
-        
-        # Create Plotly figure with secondary y-axis
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-        
-        # Calculate radius array for hover tooltips
-        radius_array = np.sqrt(self.area_array/np.pi)
-        # Interpolate radius for extended xeval points
-        radius_extended = np.zeros_like(self.xeval)
-        for i in range(len(self.xeval)):
-            if i < len(radius_array):
-                radius_extended[i] = radius_array[i]
+        Works on the exit plane only. Since p0*A* is conserved across the shock,
+        pe*Ae/(p0*At) fixes the subsonic exit Mach number in closed form. That
+        gives the stagnation pressure ratio p02/p01, which is inverted for the
+        shock Mach number M1, and A(x_shock)/At = A/A*(M1) fixes the location.
+
+        Returns:
+            (x_shock, p02/p01)
+        """
+        from scipy.optimize import brentq  # deferred: keeps `import nozzle` light
+
+        with self._phase('shock_location', pb_p0=float(pb_p0_ratio)):
+            g = self.g
+            # pe/p02 * Ae/A2* = K / (Me*sqrt(1 + (g-1)/2*Me^2))
+            K = (2 / (g + 1)) ** ((g + 1) / (2 * (g - 1)))
+            C = pb_p0_ratio * self.get_exit_area_over_throat()
+            y = (np.sqrt(1 + 2 * (g - 1) * (K / C) ** 2) - 1) / (g - 1)
+            p0_new_p0 = pb_p0_ratio / self.kernels.isentropic_pressure_ratio(np.sqrt(y), g)
+
+            M_exit_sup = self.solve_mach_number_from_area_ratio(self.get_exit_area_over_throat(), g, is_subsonic=False)
+            p0_ratio_mismatch = lambda M1: np.exp(-self.kernels.entropy_jump_normal_shock(M1, g, self.R) / self.R) - p0_new_p0
+            if p0_ratio_mismatch(M_exit_sup) >= 0:
+                M1 = M_exit_sup
+            elif p0_new_p0 >= 1:
+                M1 = 1.0
             else:
-                radius_extended[i] = radius_array[-1]
-        
-        # Create hover text with individual values
-        hover_text_M = [f'M: {M:.4f}' for M in M_array]
-        hover_text_p = [f'p/p₀: {p:.4f}' for p in p_array]
-        hover_text_r = [f'r: {r:.3f}' for r in radius_array]
-        
-        # Primary axis: M(x) and p/p0(x)
-        # Color palette: Nature/Science publication colors (Wong palette)
-        fig.add_trace(
-            go.Scatter(
-                x=self.xeval, 
-                y=M_array, 
-                name='Mach Number', 
-                line=dict(color='#0072B2', width=4),  # Nature blue, thicker line
-                hovertemplate='<b>%{text}</b><extra></extra>',
-                text=hover_text_M,
-                mode='lines'
-            ),
-            secondary_y=False,
-        )
-        fig.add_trace(
-            go.Scatter(
-                x=self.xeval, 
-                y=p_array, 
-                name='Pressure Ratio (p/p₀)', 
-                line=dict(color='#E69F00', width=3.5, dash='dash'),  # Nature orange, thicker line
-                hovertemplate='<b>%{text}</b><extra></extra>',
-                text=hover_text_p,
-                mode='lines'
-            ),
-            secondary_y=False,
-        )
-        
-        # Secondary axis: Radius - neutral gray
-        fig.add_trace(
-            go.Scatter(
-                x=self.x, 
-                y=radius_array, 
-                name='Nozzle Radius', 
-                line=dict(color='#999999', width=3.5),  # Nature gray, thicker line
-                hovertemplate='<b>%{text}</b><extra></extra>',
-                text=hover_text_r,
-                mode='lines',
-                fill='tozeroy',
-                fillcolor='rgba(153, 153, 153, 0.1)'  # Light shaded area under geometry
-            ),
-            secondary_y=True,
-        )
-        
-        # Add shock waves if needed
-        if flag_draw_oshock and beta is not None:
-            r = 2*np.linspace(0, self.xmax - self.xmin, 5)
-            ray_x = r*np.cos(-beta)
-            ray_y = r*np.sin(-beta)
-            x_arr = self.x[-1] + ray_x
-            y_arr = radius_array[-1] + ray_y
-            hover_text_shock = [f'Shockwave<br>β: {beta*180/np.pi:.3f}°' for _ in x_arr]
-            fig.add_trace(
-                go.Scatter(
-                    x=x_arr, 
-                    y=y_arr, 
-                    name=f'Shockwave (β={beta*180/np.pi:.3f}°)', 
-                    line=dict(color='#D55E00', width=4),  # Nature vermillion, thicker line
-                    hovertemplate='<b>%{text}</b><extra></extra>',
-                    text=hover_text_shock,
-                    mode='lines'
-                ),
-                secondary_y=True,
-            )
-        
-        # Add expansion fan if needed
-        if flag_draw_fan and (fan_alphas is not None):
-            x0 = self.x[-1]
-            r_exit = radius_array[-1]
-            y0 = r_exit
-            x_end = max(self.xeval)
-            
-            for j, a in enumerate(fan_alphas):
-                y_at_end = y0 - (x_end - x0) * np.tan(a)
-                if y_at_end <= 0.0:
-                    x_hit = x0 + y0 / np.tan(a)
-                    xs = np.array([x0, x_hit])
-                    ys = np.array([y0, 0.0])
-                else:
-                    xs = np.array([x0, x_end])
-                    ys = np.array([y0, y_at_end])
-                
-                hover_text_fan = [f'Expansion Fan<br>α: {a*180/np.pi:.2f}°' for _ in xs]
-                fig.add_trace(
-                    go.Scatter(
-                        x=xs, 
-                        y=ys, 
-                        name='Expansion Fan' if j == 0 else None,
-                        line=dict(color='#56B4E9', width=2.5, dash='dash'),  # Nature sky blue, thicker line
-                        hovertemplate='<b>%{text}</b><extra></extra>',
-                        text=hover_text_fan,
-                        showlegend=(j == 0),
-                        mode='lines'
-                    ),
-                    secondary_y=True,
-                )
-        
-        # Normal shock annotation below x-axis with arrow
-        shock_annotation = None
-        if flag_draw_nshock and x_shock is not None:
-            shock_annotation = dict(
-                x=x_shock,
-                y=-0.15,  # Below x-axis
-                yref='paper',
-                text='↑ Shockwave',
-                showarrow=False,
-                font=dict(size=14, color='#CC79A7'),
-                xanchor='center',
-                yanchor='top'
-            )
-        
-        # Auto-adjust axis limits based on data
-        M_max = np.max(M_array)
-        M_min = np.min(M_array)
-        p_max = np.max(p_array)
-        p_min = np.min(p_array)
-        
-        # Y-axis range for primary axis (Mach and pressure)
-        y_min = min(M_min, p_min) * 0.95  # Add 5% padding
-        y_max = max(M_max, p_max) * 1.05  # Add 5% padding
-        # Ensure minimum range and non-negative for pressure
-        y_min = max(0, y_min)  # Don't go below 0
-        if y_max - y_min < 0.1:  # Ensure minimum range
-            y_max = y_min + 0.1
-        
-        # X-axis range
-        x_min = np.min(self.xeval)
-        x_max = np.max(self.xeval)
-        x_range = x_max - x_min
-        x_min_adj = x_min - x_range * 0.02  # Add 2% padding
-        x_max_adj = x_max + x_range * 0.02
-        
-        # Set axis labels and styling with auto-adjusted limits
-        # Modern dark theme with improved contrast
-        fig.update_xaxes(
-            title_text="x (Axial Position)",
-            title_font=dict(size=18, color='#ffffff', family='Inter, sans-serif'),  # Increased font size
-            tickfont=dict(color='#d1d5db', size=16),  # Increased tick label font size
-            showgrid=True, 
-            gridcolor='rgba(156,163,175,0.12)',  # Reduced opacity (12%)
-            gridwidth=1,
-            zeroline=False,
-            range=[x_min_adj, x_max_adj],
-            linecolor='#4b5563',
-            linewidth=1
-        )
-        fig.update_yaxes(
-            title_text="M(x), p/p₀(x)",
-            title_font=dict(size=18, color='#ffffff', family='Inter, sans-serif'),  # Increased font size
-            tickfont=dict(color='#d1d5db', size=16),  # Increased tick label font size
-            secondary_y=False, 
-            range=[y_min, y_max], 
-            showgrid=True, 
-            gridcolor='rgba(156,163,175,0.12)',  # Reduced opacity (12%)
-            gridwidth=1,
-            zeroline=False,
-            linecolor='#4b5563',
-            linewidth=1
+                M1, root = brentq(p0_ratio_mismatch, 1.0, M_exit_sup, xtol=1e-12, rtol=1e-10, full_output=True)
+                if self.trace is not None:
+                    self.trace.count_root('brentq.shock_mach', root)
+
+            area_shock = self.area_throat * self.kernels.area_mach_relation(M1, g)
+            area_mismatch = lambda x: self.get_area(x) - area_shock
+            if area_mismatch(self.xmax) <= 0:
+                x_shock = self.xmax
+            elif area_mismatch(self.x_throat) >= 0:
+                x_shock = self.x_throat
+            else:
+                x_shock, root = brentq(area_mismatch, self.x_throat, self.xmax, xtol=1e-12, rtol=1e-10,
+                                       full_output=True)
+                if self.trace is not None:
+                    self.trace.count_root('brentq.shock_location', root)
+            return x_shock, p0_new_p0
+
+    @property
+    def choked_solution(self):
+        """Isentropic (M, p/p0) on self.x with a sonic throat (subsonic before
+        the throat, supersonic after).
+
+        Identical for every back pressure below crit_p_ratio_1, so it is solved
+        on first use and kept until gamma or the geometry changes. The arrays
+        are read-only.
+        """
+        if self._choked_solution is None:
+            with self._phase('interior', choked=True):
+                M = self.solve_mach_numbers_from_area_ratios(
+                    self.area_array / self.area_throat, self.g, is_subsonic=self.x < self.x_throat,
+                    trace=self.trace, backend=self.kernels)
+                p = self.kernels.isentropic_pressure_ratio(M, self.g)
+            M.flags.writeable = False
+            p.flags.writeable = False
+            self._choked_solution = (M, p)
+        return self._choked_solution
+
+    def _invalidate_flow_cache(self):
+        """Drop gas/geometry dependent results after gamma or an area changes."""
+        self._choked_solution = None
+        if hasattr(self, '_g'):
+            self._compute_critical_pressure_ratios()
+
+    def _oblique_shock_plume(self, M_exit, p_exit, pb_p0_ratios):
+        """Centerline state behind an oblique shock at the exit lip for each pb/p0.
+
+        Returns:
+            (M_plume, p_plume, beta, x_extended) with plume arrays of shape
+            (len(pb_p0_ratios), len(self.xeval) - len(self.x))
+        """
+        g = self.g
+        pb = np.asarray(pb_p0_ratios, dtype=float)[:, None]
+        r_exit = np.sqrt(self.area_array / np.pi)[-1]
+        pb_pe = pb / p_exit
+        Mn1 = np.sqrt((pb_pe - 1) * (g + 1) / (g * 2) + 1)
+        Mn2 = self.kernels.normal_shock_mach(Mn1, g)
+        beta = np.arcsin(Mn1 / M_exit)
+        tan_theta = (
+            2
+            / np.tan(beta)
+            * (M_exit**2 * np.sin(beta) ** 2 - 1)
+            / (M_exit**2 * (g + np.cos(2 * beta)) + 2)
         )
-        fig.update_yaxes(
-            title_text="r(x) (Radius)",
-            title_font=dict(size=18, color='#ffffff', family='Inter, sans-serif'),  # Increased font size
-            tickfont=dict(color='#d1d5db', size=16),  # Increased tick label font size
-            secondary_y=True, 
-            range=[0, max(radius_array)*1.1], 
-            showgrid=False,
-            linecolor='#4b5563',
-            linewidth=1
+        theta = np.arctan(tan_theta)
+        x_extended = self.xmax + r_exit / np.tan(beta)
+
+        x_plume = self.xeval[len(self.x):][None, :]
+        # the first plume point carries the exit state
+        behind_shock = (x_plume >= x_extended) & (np.arange(x_plume.shape[1]) > 0)
+        M_plume = np.where(behind_shock, Mn2 / np.sin(beta - theta), M_exit)
+        p_plume = np.where(behind_shock, pb, p_exit)
+        return M_plume, p_plume, beta[:, 0], x_extended[:, 0]
+
+    def _expansion_fan_plume(self, M_exit, p_exit, pb_p0_ratios):
+        """Centerline state through the exit expansion fan for each pb/p0.
+
+        Returns:
+            (M_plume, p_plume, fan_alphas) with fan_alphas of shape
+            (len(pb_p0_ratios), N_FAN_LINES), ordered tail -> head
+        """
+        g = self.g
+        pb = np.asarray(pb_p0_ratios, dtype=float)[:, None]
+        # far-field Mach matching pb/p0 (isentropic inversion)
+        M_far = np.sqrt((2.0 / (g - 1.0)) * (pb ** (-(g - 1.0) / g) - 1.0))
+
+        x_exit = self.xmax
+        r_exit = np.sqrt(self.area_exit / np.pi)
+        mu_exit = np.arcsin(np.clip(1.0 / M_exit, 0.0, 1.0))  # head (at exit state)
+        mu_far = np.arcsin(np.clip(1.0 / M_far, 0.0, 1.0))  # tail (fully expanded)
+        x_head = x_exit + r_exit / np.tan(mu_exit)
+        x_tail = x_exit + r_exit / np.tan(mu_far)
+        x_end = self.xeval[-1]
+        x_tail_eff = np.minimum(x_tail, x_end)
+
+        xq = self.xeval[len(self.x):][None, :]
+        with np.errstate(divide='ignore'):
+            mu = np.arctan(r_exit / np.maximum(xq - x_exit, 1e-12))
+        M_fan = np.clip(1.0 / np.sin(np.clip(mu, mu_far, mu_exit)), M_exit, M_far)
+        in_fan = (xq >= x_head) & (xq <= x_tail_eff)
+        past_fan = (xq >= x_head) & ~in_fan
+        M_plume = np.select([in_fan, past_fan], [M_fan, M_far], M_exit)
+        p_plume = np.select([in_fan, past_fan], [self.kernels.isentropic_pressure_ratio(M_fan, g), pb], p_exit)
+        # fully expanded state at the end of the domain once the tail has crossed the axis
+        reached = x_tail[:, 0] <= x_end
+        M_plume[reached, -1] = M_far[reached, 0]
+        p_plume[reached, -1] = pb[reached, 0]
+
+        fan_alphas = np.linspace(mu_far[:, 0], np.full(len(pb), mu_exit), N_FAN_LINES, axis=1)
+        return M_plume, p_plume, fan_alphas
+
+    def sweep(self, pb_p0_ratios):
+        """Compute flow profiles for many back-pressure ratios at once.
+
+        Cases are grouped by regime using crit_p_ratio_1/2/3. The choked
+        interior is solved once and shared by the three sonic-throat regimes,
+        and each group is solved with array operations over all of its cases.
+
+        Returns:
+            FlowProfile batch with one record per pb/p0 on self.xeval
+        """
+        pb = np.atleast_1d(np.asarray(pb_p0_ratios, dtype=float))
+        if pb.ndim != 1:
+            raise ValueError("pb_p0_ratios must be a 1D array")
+        if np.any(pb <= 0) or np.any(pb > 1):
+            bad = pb[(pb <= 0) | (pb > 1)][0]
+            raise ValueError(f"Pressure ratio must be between 0 and 1, got {bad}")
+
+        g = self.g
+        n = len(self.x)
+        n_pb = len(pb)
+        M_array = np.zeros((n_pb, len(self.xeval)))
+        p_array = np.zeros((n_pb, len(self.xeval)))
+        regime = self.regime(pb)
+        x_shock = np.full(n_pb, np.nan)
+        beta = np.full(n_pb, np.nan)
+        x_extended = np.full(n_pb, np.nan)
+        fan_alphas = np.full((n_pb, N_FAN_LINES), np.nan)
+
+        # Subsonic throat: exit Mach from pb, A* scaled per case
+        idx = np.flatnonzero(regime == REGIME_SUBSONIC)
+        if idx.size:
+            m_exit = np.sqrt((pb[idx] ** (-(g - 1) / g) - 1) * 2 / (g - 1))
+            with np.errstate(divide='ignore'):  # pb/p0 = 1: no flow, A/A* -> inf, M -> 0
+                Ae_over_A_star = self.kernels.area_mach_relation(m_exit, g)
+            A_over_A_star = self.area_array[None, :] / self.area_exit * Ae_over_A_star[:, None]
+            with self._phase('interior', cases=int(idx.size)):
+                M = self.solve_mach_numbers_from_area_ratios(A_over_A_star, g, is_subsonic=True,
+                                                             trace=self.trace, backend=self.kernels)
+                M_array[idx, :n] = M
+                p_array[idx, :n] = self.kernels.isentropic_pressure_ratio(M, g)
+
+        if np.any(regime != REGIME_SUBSONIC):
+            M_int, p_int = self.choked_solution
+            M_exit, p_exit = M_int[-1], p_int[-1]
+
+        # Normal shock inside the expansion: upstream part is the choked interior
+        idx = np.flatnonzero(regime == REGIME_NORMAL_SHOCK)
+        if idx.size:
+            shocks = np.array([self._solve_normal_shock_location(v) for v in pb[idx]])
+            x_shock[idx] = shocks[:, 0]
+            p0_new_p0 = shocks[:, 1]
+            downstream = self.x[None, :] >= x_shock[idx, None]
+            ratios = (self.area_array / self.area_throat)[None, :] * p0_new_p0[:, None]
+            M = np.broadcast_to(M_int, downstream.shape).copy()
+            p = np.broadcast_to(p_int, downstream.shape).copy()
+            with self._phase('interior', cases=int(idx.size)):
+                M[downstream] = self.solve_mach_numbers_from_area_ratios(ratios[downstream], g, is_subsonic=True,
+                                                                         trace=self.trace, backend=self.kernels)
+                p[downstream] = (p0_new_p0[:, None] * self.kernels.isentropic_pressure_ratio(M, g))[downstream]
+            M_array[idx, :n] = M
+            p_array[idx, :n] = p
+
+        idx = np.flatnonzero(regime == REGIME_OBLIQUE_SHOCK)
+        if idx.size:
+            M_array[idx, :n] = M_int
+            p_array[idx, :n] = p_int
+            with self._phase('plume', cases=int(idx.size)):
+                M_plume, p_plume, beta[idx], x_extended[idx] = self._oblique_shock_plume(M_exit, p_exit, pb[idx])
+            M_array[idx, n:] = M_plume
+            p_array[idx, n:] = p_plume
+
+        idx = np.flatnonzero(regime == REGIME_EXPANSION_FAN)
+        if idx.size:
+            M_array[idx, :n] = M_int
+            p_array[idx, :n] = p_int
+            with self._phase('plume', cases=int(idx.size)):
+                M_plume, p_plume, fan_alphas[idx] = self._expansion_fan_plume(M_exit, p_exit, pb[idx])
+            M_array[idx, n:] = M_plume
+            p_array[idx, n:] = p_plume
+
+        # subsonic and normal-shock cases hold the exit state downstream
+        hold = (regime == REGIME_SUBSONIC) | (regime == REGIME_NORMAL_SHOCK)
+        M_array[hold, n:] = M_array[hold, n - 1:n]
+        p_array[hold, n:] = p_array[hold, n - 1:n]
+
+        return FlowProfile.from_arrays(
+            self.xeval, M_array, p_array, pb_p0=pb, regime=regime, x_shock=x_shock,
+            beta=beta, x_extended=x_extended,
+            fan_alpha_tail=fan_alphas[:, 0], fan_alpha_head=fan_alphas[:, -1],
         )
-        
-        # Update layout for modern dark theme - legend inside plot
-        fig.update_layout(
-            plot_bgcolor='rgba(26, 26, 26, 0.85)',  # Semi-transparent for modern look
-            paper_bgcolor='rgba(26, 26, 26, 0.85)',
-            font=dict(color='#ececec', size=16, family='Inter, sans-serif'),  # Increased font size
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="center",
-                x=0.5,
-                font=dict(color='#ececec', size=14),
-                bgcolor='rgba(15,15,15,0.85)',
-                bordercolor='rgba(156,163,175,0.3)',
-                borderwidth=1,
-                itemclick="toggleothers",
-                itemdoubleclick="toggle"
-            ),
-            height=650,
-            width=None,
-            margin=dict(l=70, r=70, t=50, b=80),  # Increased bottom margin for annotation
-            annotations=[shock_annotation] if shock_annotation else [],
-            hovermode='x unified',  # Unified hover for better tooltip display
-            hoverlabel=dict(
-                bgcolor='rgba(15,15,15,0.95)',
-                bordercolor='#06b6d4',
-                font_size=11,
-                font_family='Inter, sans-serif'
-            )
+
+    def flow_profile(self, pb_p0_ratio):
+        """Flow profile for one back-pressure ratio as a FlowProfile."""
+        M_array, p_array, viz_data = self._calculate_flow_profile(pb_p0_ratio)
+        return FlowProfile.from_viz_data(self.xeval, M_array, p_array, viz_data,
+                                         pb_p0=pb_p0_ratio, regime=self.regime(pb_p0_ratio))
+
+    def regime(self, pb_p0_ratio):
+        """Flow regime code (REGIME_*) for a back-pressure ratio or array of them."""
+        pb = np.asarray(pb_p0_ratio, dtype=float)
+        return np.select(
+            [pb > self.crit_p_ratio_1, pb > self.crit_p_ratio_2, pb > self.crit_p_ratio_3],
+            [REGIME_SUBSONIC, REGIME_NORMAL_SHOCK, REGIME_OBLIQUE_SHOCK],
+            REGIME_EXPANSION_FAN,
         )
-        
-        return fig
+
+    def _fan_lines(self, fan_alphas):
+        """End points of the expansion-fan lines drawn from the exit lip.
+
+        Each line runs down at angle alpha until it reaches the centerline or
+        the end of the extended domain, whichever comes first.
+
+        Returns:
+            (xs, ys), each of shape (len(fan_alphas), 2)
+        """
+        a = np.asarray(fan_alphas, dtype=float)
+        x0 = self.x[-1]
+        y0 = np.sqrt(self.area_array[-1] / np.pi)
+        x_end = self.xeval[-1]
+        y_at_end = y0 - (x_end - x0) * np.tan(a)
+        hits_axis = y_at_end <= 0.0
+        x_stop = np.where(hits_axis, x0 + y0 / np.tan(a), x_end)
+        y_stop = np.where(hits_axis, 0.0, y_at_end)
+        xs = np.column_stack([np.full_like(a, x0), x_stop])
+        ys = np.column_stack([np.full_like(a, y0), y_stop])
+        return xs, ys
+
+    def plot_flow_profile(self, pb_p0_ratio, profile=None):
+        """Plot flow profile using matplotlib (see plotting.plot_flow_profile)."""
+        import plotting
+        return plotting.plot_flow_profile(self, pb_p0_ratio, profile)
+
+    def plot_flow_profile_plotly(self, pb_p0_ratio, profile=None, **options):
+        """Create Plotly figure for flow profile (see plotting.plot_flow_profile_plotly
+        for ``options``: max_points, webgl_threshold)."""
+        import plotting
+        return plotting.plot_flow_profile_plotly(self, pb_p0_ratio, profile, **options)
+
+    def plot_flow_sweep_plotly(self, pb_p0_ratios, **options):
+        """Animated Plotly figure over many pb/p0 (see plotting.plot_flow_sweep_plotly)."""
+        import plotting
+        return plotting.plot_flow_sweep_plotly(self, pb_p0_ratios, **options)
 
     def get_area(self, x):
         return self.A(x)
@@ -616,26 +712,35 @@ class Nozzle(object):
         return A/self.area_throat
 
     def solve_mach_number_from_area_ratio(self, ratio, gamma, is_subsonic=True):
-        eq = lambda m: m**2*ratio**2 - (2/(gamma+1)*(1+(gamma-1)/2*m**2))**((gamma+1)/(gamma-1)) 
-        if is_subsonic:
-            sol = scipy.optimize.root_scalar(eq, bracket=[0, 1], method='brentq', maxiter=1000,xtol=1e-7,rtol=1e-7)
-        else:
-            sol = scipy.optimize.root_scalar(eq, bracket=[1, 20], method='brentq', maxiter=1000,xtol=1e-7,rtol=1e-7)
-        return sol.root
+        return float(self.solve_mach_numbers_from_area_ratios(ratio, gamma, is_subsonic=is_subsonic,
+                                                              trace=self.trace, backend=self.kernels))
+
+    @property
+    def g(self):
+        return self._g
+
+    @g.setter
+    def g(self, value):
+        self._g = value
+        self._invalidate_flow_cache()
 
     @property
     def area_exit(self):
-        return self._area_exit
+        return self.geometry.area_exit
 
     @area_exit.setter
     def area_exit(self,value):
-        self._area_exit = value
+        self.geometry = copy.copy(self.geometry)  # never modify a shared geometry
+        self.geometry.area_exit = value
+        self._invalidate_flow_cache()
 
     @property
     def area_throat(self):
-        return self._area_throat
+        return self.geometry.area_throat
         
     @area_throat.setter
     def area_throat(self,value):
-        self._area_throat = value
+        self.geometry = copy.copy(self.geometry)  # never modify a shared geometry
+        self.geometry.area_throat = value
+        self._invalidate_flow_cache()
 
@@ -0,0 +1,578 @@
+"""Matplotlib and Plotly renderers for Nozzle flow profiles.
+
+Kept out of nozzle.py so the solver imports only NumPy and SciPy. Nozzle's
+plot methods import this module on first use, and each renderer imports
+its plotting library when first called.
+"""
+import base64
+import copy
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _profile_arrays(nozzle, pb_p0_ratio, profile):
+    """(M, p, viz_data) from a precomputed FlowProfile, or solved if it is None."""
+    if profile is None:
+        return nozzle._calculate_flow_profile(pb_p0_ratio)
+    return profile.M, profile.p, profile.viz_data
+
+
+def plot_flow_profile(nozzle, pb_p0_ratio, profile=None):
+    """Plot flow profile using matplotlib.
+
+    ``profile`` is an optional precomputed FlowProfile at ``pb_p0_ratio``
+    on ``nozzle.xeval`` (e.g. one record of a sweep); it replaces the solve.
+    """
+    from matplotlib import pyplot as plt
+
+    M_array, p_array, viz_data = _profile_arrays(nozzle, pb_p0_ratio, profile)
+    flag_draw_oshock = viz_data['flag_draw_oshock']
+    flag_draw_fan = viz_data['flag_draw_fan']
+    fan_alphas = viz_data['fan_alphas']
+    beta = viz_data['beta']
+    
+    with nozzle._phase('figure', backend='matplotlib'):
+        # start to draw
+        fig, ax1 = plt.subplots(figsize=(12, 6))
+        fig.patch.set_facecolor('white')
+        ax1.set_facecolor('white')
+
+        # Plot M(x) and p/p0(x) on primary axis
+        ax1.plot(nozzle.xeval, M_array, color='green', linewidth=2, label='$M(x)$')
+        ax1.plot(nozzle.xeval, p_array, color='orange', linestyle='--', linewidth=2, label=r'$p/p_0(x)$')
+    
+        ax1.set_xlabel('Axial Position $x$', fontsize=12)
+        ax1.set_ylabel('Mach Number / Pressure Ratio', fontsize=12)
+        ax1.set_xlim([min(nozzle.xeval), max(nozzle.xeval)])
+        ax1.set_ylim([0, 5])
+        ax1.grid(True, alpha=0.3)
+    
+        # Create secondary axis for area
+        ax2 = ax1.twinx()
+        ax2.set_facecolor('white')
+    
+        # Plot area on secondary axis
+        ax2.plot(nozzle.x, np.sqrt(nozzle.area_array/np.pi), color='black', linewidth=2, label='$A(x)$')
+        if flag_draw_oshock:
+            r = 2*np.linspace(0, nozzle.xmax - nozzle.xmin, 5)
+            ray_x = r*np.cos(-beta)
+            ray_y = r*np.sin(-beta)
+            x_arr = nozzle.x[-1] + ray_x
+            y_arr = np.sqrt(nozzle.area_array/np.pi)[-1] + ray_y
+            x_arr_2 = 0.01*(nozzle.xmax - nozzle.xmin)+nozzle.x[-1] + ray_x
+            y_arr_2 = 0.01*(max(np.sqrt(nozzle.area_array/np.pi))-min(np.sqrt(nozzle.area_array/np.pi))) + np.sqrt(nozzle.area_array/np.pi)[-1] + ray_y
+            ax2.plot(x_arr, y_arr, color='red', lw=2, label=f'shockwave (beta={beta*180/np.pi:.3f}°)')
+            ax2.plot(x_arr_2, y_arr_2, color='red', lw=2)
+        
+        if flag_draw_fan and (fan_alphas is not None):
+            fan_xs, fan_ys = nozzle._fan_lines(fan_alphas)
+            for j, (xs, ys) in enumerate(zip(fan_xs, fan_ys)):
+                ax2.plot(xs, ys, linestyle="--", linewidth=1.5, color="blue",
+                         label="expansion fan" if j == 0 else None)
+    
+        ax2.set_ylabel('Radius', fontsize=12, color='black')
+        ax2.set_ylim([0,max(np.sqrt(nozzle.area_array/np.pi))*1.1])
+        ax2.tick_params(axis='y', labelcolor='black')
+    
+        # Combine legends
+        lines1, labels1 = ax1.get_legend_handles_labels()
+        lines2, labels2 = ax2.get_legend_handles_labels()
+        ax1.legend(lines1 + lines2, labels1 + labels2,
+                   loc='upper center',
+                   bbox_to_anchor=(0.5, -0.15),  # Below the plot
+                   ncol=4,
+                   fontsize=10,
+                   frameon=False)
+        # Use try-except to handle potential tight_layout issues with mathtext
+        try:
+            plt.tight_layout(rect=[0, 0.1, 1, 1])
+        except (ValueError, Exception):
+            # If tight_layout fails, use a simpler layout adjustment
+            plt.tight_layout()
+    
+    return fig
+
+
+# Traces with more points than this are drawn with WebGL (Scattergl)
+WEBGL_THRESHOLD = 5000
+
+# Plotly figure templates (themed layout and radius trace) per nozzle grid
+_TEMPLATE_CACHE_SIZE = 16
+_templates = OrderedDict()
+_templates_lock = threading.Lock()
+
+
+def lttb(x, y, n_out):
+    """Indices of ``n_out`` points of (x, y) chosen by Largest-Triangle-Three-Buckets.
+
+    The interior points are split into n_out - 2 buckets; from each, the
+    point forming the largest triangle with the previously chosen point and
+    the mean of the next bucket is kept. The first and last points are
+    always kept.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    # bucket means, with the last point standing in for the bucket after the last
+    counts = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts, x[-1]).tolist()
+    mean_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts, y[-1]).tolist()
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    edges = edges.tolist()
+    xa, ya = float(x[0]), float(y[0])
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # twice the triangle area, written as |u*y + v*x + w| over the bucket
+        u = xa - mean_x[i + 1]
+        v = mean_y[i + 1] - ya
+        a = lo + int(np.argmax(np.abs(u * y[lo:hi] + v * x[lo:hi] - (u * ya + v * xa))))
+        idx[i + 1] = a
+        xa, ya = float(x[a]), float(y[a])
+    return idx
+
+
+def downsample(x, y, n_out, keep=()):
+    """Indices of about ``n_out`` points of (x, y) for plotting.
+
+    The ``keep`` indices (e.g. both sides of a shock jump) are always
+    included; LTTB runs separately on each stretch between them, with a
+    share of ``n_out`` proportional to its length.
+    """
+    n = len(x)
+    if n_out is None or n <= n_out:
+        return np.arange(n)
+    breaks = np.unique(np.clip(np.concatenate([[0, n - 1], np.asarray(keep, dtype=int)]), 0, n - 1))
+    pieces = [lo + lttb(x[lo:hi + 1], y[lo:hi + 1], max(2, round(n_out * (hi - lo + 1) / n)))
+              for lo, hi in zip(breaks[:-1], breaks[1:])]
+    return np.unique(np.concatenate(pieces))
+
+
+def _scatter_type(n_points, webgl_threshold):
+    return 'scattergl' if webgl_threshold is not None and n_points > webgl_threshold else 'scatter'
+
+
+def _build_plotly_template(nozzle, max_points, webgl_threshold):
+    """Themed layout and radius trace of the Plotly figure, as plain dicts.
+
+    Everything here depends only on the nozzle grid and the rendering
+    options; the primary y range and the shock annotation are filled in per
+    profile.
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    # Create Plotly figure with secondary y-axis
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    radius_array = np.sqrt(nozzle.area_array/np.pi)
+    i_throat = int(np.argmin(np.abs(nozzle.x - nozzle.x_throat)))
+    idx = downsample(nozzle.x, radius_array, max_points, keep=[i_throat])
+    scatter = go.Scattergl if _scatter_type(len(idx), webgl_threshold) == 'scattergl' else go.Scatter
+
+    # Secondary axis: Radius - neutral gray
+    fig.add_trace(
+        scatter(
+            x=nozzle.x[idx], 
+            y=radius_array[idx], 
+            name='Nozzle Radius', 
+            line=dict(color='#999999', width=3.5),  # Nature gray, thicker line
+            hovertemplate='<b>r: %{y:.3f}</b><extra></extra>',
+            mode='lines',
+            fill='tozeroy',
+            fillcolor='rgba(153, 153, 153, 0.1)'  # Light shaded area under geometry
+        ),
+        secondary_y=True,
+    )
+
+    # X-axis range
+    x_min = np.min(nozzle.xeval)
+    x_max = np.max(nozzle.xeval)
+    x_range = x_max - x_min
+    x_min_adj = x_min - x_range * 0.02  # Add 2% padding
+    x_max_adj = x_max + x_range * 0.02
+
+    # Set axis labels and styling
+    # Modern dark theme with improved contrast
+    fig.update_xaxes(
+        title_text="x (Axial Position)",
+        title_font=dict(size=18, color='#ffffff', family='Inter, sans-serif'),  # Increased font size
+        tickfont=dict(color='#d1d5db', size=16),  # Increased tick label font size
+        showgrid=True, 
+        gridcolor='rgba(156,163,175,0.12)',  # Reduced opacity (12%)
+        gridwidth=1,
+        zeroline=False,
+        range=[x_min_adj, x_max_adj],
+        linecolor='#4b5563',
+        linewidth=1
+    )
+    fig.update_yaxes(
+        title_text="M(x), p/p₀(x)",
+        title_font=dict(size=18, color='#ffffff', family='Inter, sans-serif'),  # Increased font size
+        tickfont=dict(color='#d1d5db', size=16),  # Increased tick label font size
+        secondary_y=False, 
+        showgrid=True, 
+        gridcolor='rgba(156,163,175,0.12)',  # Reduced opacity (12%)
+        gridwidth=1,
+        zeroline=False,
+        linecolor='#4b5563',
+        linewidth=1
+    )
+    fig.update_yaxes(
+        title_text="r(x) (Radius)",
+        title_font=dict(size=18, color='#ffffff', family='Inter, sans-serif'),  # Increased font size
+        tickfont=dict(color='#d1d5db', size=16),  # Increased tick label font size
+        secondary_y=True, 
+        range=[0, max(radius_array)*1.1], 
+        showgrid=False,
+        linecolor='#4b5563',
+        linewidth=1
+    )
+
+    # Update layout for modern dark theme - legend inside plot
+    fig.update_layout(
+        plot_bgcolor='rgba(26, 26, 26, 0.85)',  # Semi-transparent for modern look
+        paper_bgcolor='rgba(26, 26, 26, 0.85)',
+        font=dict(color='#ececec', size=16, family='Inter, sans-serif'),  # Increased font size
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="center",
+            x=0.5,
+            font=dict(color='#ececec', size=14),
+            bgcolor='rgba(15,15,15,0.85)',
+            bordercolor='rgba(156,163,175,0.3)',
+            borderwidth=1,
+            itemclick="toggleothers",
+            itemdoubleclick="toggle"
+        ),
+        height=650,
+        width=None,
+        margin=dict(l=70, r=70, t=50, b=80),  # Increased bottom margin for annotation
+        hovermode='x unified',  # Unified hover for better tooltip display
+        hoverlabel=dict(
+            bgcolor='rgba(15,15,15,0.95)',
+            bordercolor='#06b6d4',
+            font_size=11,
+            font_family='Inter, sans-serif'
+        )
+    )
+
+    # per-object to_plotly_json keeps the arrays as numpy; Figure.to_dict (and
+    # Figure.to_plotly_json) would base64-encode them
+    return {'radius': fig.data[0].to_plotly_json(), 'layout': fig.layout.to_plotly_json()}
+
+
+def _plotly_template(nozzle, max_points, webgl_threshold):
+    """Cached _build_plotly_template for the grid of ``nozzle`` (shared by its copies)."""
+    key = (id(nozzle.x), id(nozzle.xeval), max_points, webgl_threshold)
+    with _templates_lock:
+        entry = _templates.get(key)
+        # the entry holds the arrays, so a matching id is the same grid
+        if entry is not None and entry[0] is nozzle.x and entry[1] is nozzle.xeval:
+            _templates.move_to_end(key)
+            return entry[2]
+    template = _build_plotly_template(nozzle, max_points, webgl_threshold)
+    with _templates_lock:
+        _templates[key] = (nozzle.x, nozzle.xeval, template)
+        while len(_templates) > _TEMPLATE_CACHE_SIZE:
+            _templates.popitem(last=False)
+    return template
+
+
+# Profile trace styles; color palette: Nature/Science publication colors (Wong palette)
+_TRACE_STYLES = {
+    'M': dict(
+        name='Mach Number',
+        line=dict(color='#0072B2', width=4),  # Nature blue, thicker line
+        hovertemplate='<b>M: %{y:.4f}</b><extra></extra>',
+        mode='lines', xaxis='x', yaxis='y',
+    ),
+    'p': dict(
+        name='Pressure Ratio (p/p₀)',
+        line=dict(color='#E69F00', width=3.5, dash='dash'),  # Nature orange, thicker line
+        hovertemplate='<b>p/p₀: %{y:.4f}</b><extra></extra>',
+        mode='lines', xaxis='x', yaxis='y',
+    ),
+    'shock': dict(
+        line=dict(color='#D55E00', width=4),  # Nature vermillion, thicker line
+        mode='lines', xaxis='x', yaxis='y2',
+    ),
+    'fan': dict(
+        line=dict(color='#56B4E9', width=2.5, dash='dash'),  # Nature sky blue, thicker line
+        mode='lines', xaxis='x', yaxis='y2',
+    ),
+}
+
+
+def _trace(style, **props):
+    """Plain-dict scatter trace with one of the _TRACE_STYLES."""
+    return dict(copy.deepcopy(_TRACE_STYLES[style]), type='scatter', **props)
+
+
+def _keep_indices(nozzle, x_shock):
+    """xeval indices kept by downsampling: throat, exit/plume start, shock jump."""
+    n = len(nozzle.x)
+    keep = [int(np.argmin(np.abs(nozzle.x - nozzle.x_throat))), n - 1, n]
+    if x_shock is not None:
+        i = int(np.searchsorted(nozzle.x, x_shock))
+        keep += [i - 1, i]
+    return keep
+
+
+def _shock_ray(nozzle, beta):
+    """Oblique shock line from the exit lip at angle beta."""
+    r = 2*np.linspace(0, nozzle.xmax - nozzle.xmin, 5)
+    ray_x = r*np.cos(-beta)
+    ray_y = r*np.sin(-beta)
+    return nozzle.x[-1] + ray_x, np.sqrt(nozzle.area_array[-1]/np.pi) + ray_y
+
+
+def _shock_annotation(x_shock):
+    """Normal shock annotation below the x-axis."""
+    return dict(
+        x=x_shock,
+        y=-0.15,  # Below x-axis
+        yref='paper',
+        text='↑ Shockwave',
+        showarrow=False,
+        font=dict(size=14, color='#CC79A7'),
+        xanchor='center',
+        yanchor='top'
+    )
+
+
+def _typed_array(values, dtype='<f4'):
+    """Plotly typed-array spec (base64 data); plotly skips element-wise validation
+    for these, and float32 halves the payload of display-only data."""
+    data = np.ascontiguousarray(values, dtype=dtype)
+    return dict(dtype=data.dtype.str.lstrip('<|'), bdata=base64.b64encode(data.tobytes()).decode('ascii'))
+
+
+def _y_range(M_array, p_array):
+    """Primary y-axis range fitted to the Mach and pressure data."""
+    # Add 5% padding
+    y_min = min(np.min(M_array), np.min(p_array)) * 0.95
+    y_max = max(np.max(M_array), np.max(p_array)) * 1.05
+    # Ensure minimum range and non-negative for pressure
+    y_min = max(0, y_min)  # Don't go below 0
+    if y_max - y_min < 0.1:  # Ensure minimum range
+        y_max = y_min + 0.1
+    return [float(y_min), float(y_max)]
+
+
+def plot_flow_profile_plotly(nozzle, pb_p0_ratio, profile=None, max_points=None,
+                             webgl_threshold=WEBGL_THRESHOLD):
+    """Create Plotly figure for flow profile (``profile`` as in plot_flow_profile).
+
+    The themed layout is built and validated once per nozzle grid (see
+    _plotly_template); each call only adds the profile traces, with hover
+    labels formatted by hovertemplate from the raw arrays.
+
+    With ``max_points``, the M, p/p0 and radius traces are downsampled with
+    LTTB to about that many points, always keeping the throat, the exit and
+    both sides of a normal shock. Traces longer than ``webgl_threshold``
+    points (None: never) are drawn as Scattergl.
+    """
+    import plotly.graph_objects as go
+
+    try:
+        M_array, p_array, viz_data = _profile_arrays(nozzle, pb_p0_ratio, profile)
+        flag_draw_oshock = viz_data["flag_draw_oshock"]
+        flag_draw_fan = viz_data["flag_draw_fan"]
+        flag_draw_nshock = viz_data["flag_draw_nshock"]
+        x_shock = viz_data["x_shock"]
+        fan_alphas = viz_data["fan_alphas"]
+        beta = viz_data["beta"]
+    except (ValueError, ZeroDivisionError, OverflowError) as e:
+        raise ValueError(f"Numerical error in flow calculation: {str(e)}")
+    except Exception as e:
+        raise RuntimeError(f"Unexpected error in flow calculation: {str(e)}")
+    
+    with nozzle._phase('figure', backend='plotly'):
+        template = copy.deepcopy(_plotly_template(nozzle, max_points, webgl_threshold))
+        layout = template['layout']
+
+        keep = _keep_indices(nozzle, x_shock if flag_draw_nshock else None)
+        idx_M = downsample(nozzle.xeval, M_array, max_points, keep)
+        idx_p = downsample(nozzle.xeval, p_array, max_points, keep)
+
+        # Primary axis: M(x) and p/p0(x); secondary axis: radius from the template
+        data = [
+            _trace('M', x=nozzle.xeval[idx_M], y=M_array[idx_M]),
+            _trace('p', x=nozzle.xeval[idx_p], y=p_array[idx_p]),
+            template['radius'],
+        ]
+        data[0]['type'] = _scatter_type(len(idx_M), webgl_threshold)
+        data[1]['type'] = _scatter_type(len(idx_p), webgl_threshold)
+    
+        # Add shock waves if needed
+        if flag_draw_oshock and beta is not None:
+            x_arr, y_arr = _shock_ray(nozzle, beta)
+            data.append(_trace(
+                'shock', x=x_arr, y=y_arr,
+                name=f'Shockwave (β={beta*180/np.pi:.3f}°)',
+                hovertemplate=f'<b>Shockwave<br>β: {beta*180/np.pi:.3f}°</b><extra></extra>',
+            ))
+    
+        # Add expansion fan if needed
+        if flag_draw_fan and (fan_alphas is not None):
+            fan_xs, fan_ys = nozzle._fan_lines(fan_alphas)
+            for j, (a, xs, ys) in enumerate(zip(fan_alphas, fan_xs, fan_ys)):
+                fan = _trace(
+                    'fan', x=xs, y=ys,
+                    hovertemplate=f'<b>Expansion Fan<br>α: {a*180/np.pi:.2f}°</b><extra></extra>',
+                    showlegend=(j == 0),
+                )
+                if j == 0:
+                    fan['name'] = 'Expansion Fan'
+                data.append(fan)
+    
+        # Normal shock annotation below x-axis with arrow
+        if flag_draw_nshock and x_shock is not None:
+            layout['annotations'] = [_shock_annotation(x_shock)]
+    
+        # Auto-adjust primary axis limits based on data
+        layout['yaxis']['range'] = _y_range(M_array, p_array)
+
+        # the template was validated when it was built and the traces use
+        # fixed, known-good properties, so skip plotly's per-property validation
+        fig = go.Figure(dict(data=data, layout=layout), _validate=False)
+    
+    return fig
+
+
+def plot_flow_sweep_plotly(nozzle, pb_p0_ratios, profiles=None, max_points=None, frame_duration=80):
+    """Animated Plotly figure of the flow profiles at ``pb_p0_ratios``.
+
+    All profiles come from one Nozzle.sweep (or the FlowProfile batch
+    ``profiles`` for these ratios) and are packed as animation frames, one
+    per ratio in the given order, each with its shock or fan overlay and
+    normal-shock marker. Play/pause buttons and a slider labelled with
+    pb/p0 and the flow regime run the animation in the browser without
+    further server work. The primary y range is fixed over the sweep.
+
+    Frames only carry the y values of M and p/p0 (the grid is shared)
+    unless ``max_points`` is smaller than the grid; then each frame is
+    downsampled as in plot_flow_profile_plotly and carries its own x.
+    Frame arrays are float32 typed arrays (base64, decoded by plotly.js
+    2.28+); the first frame keeps numpy arrays, so fig.data holds arrays.
+    """
+    import plotly.graph_objects as go
+    from flow_profile import N_FAN_LINES, REGIME_NAMES
+
+    pb = np.atleast_1d(np.asarray(pb_p0_ratios, dtype=float))
+    if profiles is None:
+        profiles = nozzle.sweep(pb)
+
+    with nozzle._phase('figure', backend='plotly', frames=len(pb)):
+        layout = copy.deepcopy(_plotly_template(nozzle, max_points, None))
+        radius = layout['radius']
+        layout = layout['layout']
+        shared_x = max_points is None or len(nozzle.xeval) <= max_points
+        # trace slots: 0 M, 1 p/p0, 2 radius (static), 3 oblique shock, 4.. fan lines
+        animated = [0, 1] + list(range(3, 4 + N_FAN_LINES))
+
+        frames = []
+        for k, profile in enumerate(profiles):
+            viz_data = profile.viz_data
+            M_array, p_array = profile.M, profile.p
+            # frames hold typed arrays: validating ~10 traces per frame element
+            # by element would dominate the build time. The first frame also
+            # seeds the initial traces, so it keeps plain arrays.
+            encode = np.asarray if k == 0 else _typed_array
+            if shared_x:
+                M_trace = dict(y=encode(M_array))  # x is the shared grid
+                p_trace = dict(y=encode(p_array))
+            else:
+                keep = _keep_indices(nozzle, viz_data['x_shock'] if viz_data['flag_draw_nshock'] else None)
+                idx_M = downsample(nozzle.xeval, M_array, max_points, keep)
+                idx_p = downsample(nozzle.xeval, p_array, max_points, keep)
+                M_trace = dict(x=encode(nozzle.xeval[idx_M]), y=encode(M_array[idx_M]))
+                p_trace = dict(x=encode(nozzle.xeval[idx_p]), y=encode(p_array[idx_p]))
+
+            shock = dict(x=[], y=[])
+            if viz_data['flag_draw_oshock'] and viz_data['beta'] is not None:
+                beta = viz_data['beta']
+                x_arr, y_arr = _shock_ray(nozzle, beta)
+                shock = dict(x=encode(x_arr), y=encode(y_arr),
+                             hovertemplate=f'<b>Shockwave<br>β: {beta*180/np.pi:.3f}°</b><extra></extra>')
+            fans = [dict(x=[], y=[]) for _ in range(N_FAN_LINES)]
+            if viz_data['flag_draw_fan'] and viz_data['fan_alphas'] is not None:
+                fan_xs, fan_ys = nozzle._fan_lines(viz_data['fan_alphas'])
+                fans = [dict(x=encode(xs), y=encode(ys),
+                             hovertemplate=f'<b>Expansion Fan<br>α: {a*180/np.pi:.2f}°</b><extra></extra>')
+                        for a, xs, ys in zip(viz_data['fan_alphas'], fan_xs, fan_ys)]
+
+            # one annotation slot in every frame, so a shock marker is also hidden again
+            marker = _shock_annotation(nozzle.x[-1])
+            marker['visible'] = False
+            if viz_data['flag_draw_nshock'] and viz_data['x_shock'] is not None:
+                marker.update(x=viz_data['x_shock'], visible=True)
+            frames.append(dict(
+                name=str(k),
+                data=[M_trace, p_trace, shock] + fans,
+                traces=animated,
+                layout=dict(annotations=[marker]),
+            ))
+
+        # Initial state: the first frame on full traces
+        first = frames[0]['data']
+        xeval = dict(x=nozzle.xeval) if shared_x else {}
+        data = [
+            _trace('M', **{**xeval, **first[0]}),
+            _trace('p', **{**xeval, **first[1]}),
+            radius,
+            _trace('shock', name='Oblique Shock', **first[2]),
+        ]
+        data += [_trace('fan', showlegend=(j == 0), name='Expansion Fan', **fan)
+                 for j, fan in enumerate(first[3:])]
+        layout['annotations'] = frames[0]['layout']['annotations']
+        layout['yaxis']['range'] = _y_range(profiles.M, profiles.p)
+
+        # Browser-side playback: play/pause buttons and a pb/p0 slider
+        play = dict(frame=dict(duration=frame_duration, redraw=True), fromcurrent=True,
+                    transition=dict(duration=0), mode='immediate')
+        jump = dict(frame=dict(duration=0, redraw=True), transition=dict(duration=0), mode='immediate')
+        layout['height'] = 760
+        layout['margin'] = dict(l=70, r=70, t=50, b=190)  # room for the annotation and the slider
+        layout['updatemenus'] = [dict(
+            type='buttons',
+            direction='left',
+            x=0.0, y=-0.3, xanchor='left', yanchor='top',
+            pad=dict(r=10, t=10),
+            bgcolor='#1f1f1f',
+            bordercolor='#2d2d2d',
+            font=dict(color='#ececec', size=14),
+            showactive=False,
+            buttons=[
+                dict(label='▶ Play', method='animate', args=[None, play]),
+                dict(label='❚❚ Pause', method='animate', args=[[None], jump]),
+            ],
+        )]
+        layout['sliders'] = [dict(
+            active=0,
+            x=0.16, len=0.84, y=-0.3, xanchor='left', yanchor='top',
+            pad=dict(t=10),
+            bgcolor='#2d2d2d',
+            activebgcolor='#06b6d4',
+            bordercolor='#2d2d2d',
+            tickcolor='#4b5563',
+            font=dict(color='rgba(0,0,0,0)'),  # one tick label per frame would overlap; hide them
+            currentvalue=dict(prefix='p_b/p₀ = ', font=dict(color='#06b6d4', size=14)),
+            steps=[dict(
+                method='animate',
+                label=f"{p:.4g} · {REGIME_NAMES[int(r)].replace('_', ' ')}",
+                args=[[frame['name']], jump],
+            ) for p, r, frame in zip(profiles.pb_p0, profiles.regime, frames)],
+        )]
+
+        # see plot_flow_profile_plotly on skipping validation
+        fig = go.Figure(dict(data=data, layout=layout, frames=frames), _validate=False)
+
+    return fig
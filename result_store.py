@@ -0,0 +1,232 @@
+"""Columnar, memory-mapped store for sweep results.
+
+Layout of a store directory::
+
+    meta.json               n_points, blocks (geometry hash, gamma, rows)
+    grids/<hash>.npy        axial grid (xeval) of each geometry
+    grids/<hash>.json       geometry parameters
+    blocks/<block>/<col>.npy  one file per column: M, p (rows x n_points)
+                              and the FlowProfile scalar fields
+
+Each ``append`` writes one block holding a single (geometry, gamma) batch
+sorted by pb/p0, so the block's pb_p0 column is its own sorted index and
+appending never touches earlier blocks. A query finds the blocks of a
+geometry and gamma in a small in-memory table sorted by (geometry hash,
+gamma), binary-searches the pb/p0 range in each and merges the rows.
+The matching rows are a contiguous slice of each block, so ``select``
+returns them as memory-mapped views without copying. The store assumes
+a single writer.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from flow_profile import SCALAR_FIELDS, FlowProfile, profile_dtype
+
+PROFILE_COLUMNS = ('M', 'p')
+SCALAR_COLUMNS = SCALAR_FIELDS
+INDEX_DTYPE = np.dtype([('geom_hash', 'u8'), ('gamma', 'f8'), ('pb_p0', 'f8'),
+                        ('block', 'u4'), ('row', 'u4')])
+BLOCK_DTYPE = np.dtype([('geom_hash', 'u8'), ('gamma', 'f8'), ('block', 'u4'), ('rows', 'u4')])
+
+
+def geometry_hash(params):
+    """64-bit hash of a geometry parameter dict (values to 10 significant digits)."""
+    text = json.dumps({k: float(f"{float(v):.10g}") for k, v in sorted(params.items())})
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little')
+
+
+def _save_atomic(path, array):
+    tmp = f"{path}.tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+class ResultStore(object):
+    """Append-only columnar store of flow profiles, indexed per block."""
+
+    def __init__(self, root, n_points=None) -> None:
+        self.root = root
+        self._meta_path = os.path.join(root, 'meta.json')
+        self._blocks = {}
+        self._pb_p0 = {}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.meta = json.load(f)
+            if n_points is not None and n_points != self.meta['n_points']:
+                raise ValueError(f"Store holds {self.meta['n_points']}-point profiles, got n_points={n_points}")
+        else:
+            self.meta = {'n_points': n_points, 'blocks': []}
+            os.makedirs(os.path.join(root, 'grids'), exist_ok=True)
+            os.makedirs(os.path.join(root, 'blocks'), exist_ok=True)
+        table = np.array([(int(info['geom_hash'], 16), info['gamma'], block, info['rows'])
+                          for block, info in enumerate(self.meta['blocks'])], dtype=BLOCK_DTYPE)
+        self._table = table[np.lexsort((table['block'], table['gamma'], table['geom_hash']))]
+
+    def __len__(self):
+        return int(self._table['rows'].sum())
+
+    @property
+    def index(self):
+        """Every row as (geom_hash, gamma, pb_p0, block, row), sorted (built on demand)."""
+        return self.query()
+
+    @property
+    def n_blocks(self):
+        return len(self.meta['blocks'])
+
+    def append(self, profiles, params, gamma):
+        """Store a FlowProfile batch computed for one geometry and gamma.
+
+        Every batch of one geometry must be on the same grid (xeval);
+        a batch on another grid raises ValueError.
+
+        Returns:
+            block id
+        """
+        n_points = profiles.M.shape[-1]
+        if self.meta['n_points'] is None:
+            self.meta['n_points'] = n_points
+        elif n_points != self.meta['n_points']:
+            raise ValueError(f"Store holds {self.meta['n_points']}-point profiles, got {n_points}")
+
+        h = geometry_hash(params)
+        x = np.ascontiguousarray(np.atleast_2d(profiles.x)[0])
+        grid_path = os.path.join(self.root, 'grids', f"{h:016x}")
+        if not os.path.exists(grid_path + '.npy'):
+            _save_atomic(grid_path + '.npy', x)
+            with open(grid_path + '.json', 'w') as f:
+                json.dump({k: float(v) for k, v in params.items()}, f)
+        elif not np.array_equal(np.load(grid_path + '.npy', mmap_mode='r'), x):
+            # the grid is keyed by the geometry parameters only
+            raise ValueError(f"Store holds geometry {params} on a different grid "
+                             f"(grid kind or n_plume); use a separate store")
+
+        data = np.atleast_1d(profiles.data)
+        data = data[np.argsort(data['pb_p0'], kind='stable')]
+        block = self.n_blocks
+        block_dir = os.path.join(self.root, 'blocks', f"{block:06d}")
+        os.makedirs(block_dir, exist_ok=True)
+        for col in PROFILE_COLUMNS + SCALAR_COLUMNS:
+            np.save(os.path.join(block_dir, f"{col}.npy"), np.ascontiguousarray(data[col]))
+
+        self.meta['blocks'].append({'geom_hash': f"{h:016x}", 'gamma': float(gamma), 'rows': len(data)})
+        tmp = self._meta_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._meta_path)
+
+        # merge-insert into the block table; blocks of one key stay in append order
+        entry = np.array([(h, gamma, block, len(data))], dtype=BLOCK_DTYPE)
+        at = self._find_blocks(h, gamma).stop
+        self._table = np.concatenate([self._table[:at], entry, self._table[at:]])
+        return block
+
+    def append_exploration(self, cases):
+        """Append every successful case returned by explore.explore."""
+        for case in cases:
+            if case['error'] is None:
+                self.append(case['profiles'], case['params'], case['gamma'])
+
+    def block(self, block):
+        """Memory-mapped columns of one block, plus its grid under 'x'."""
+        if block not in self._blocks:
+            block_dir = os.path.join(self.root, 'blocks', f"{block:06d}")
+            columns = {col: np.load(os.path.join(block_dir, f"{col}.npy"), mmap_mode='r')
+                       for col in PROFILE_COLUMNS + SCALAR_COLUMNS}
+            info = self.meta['blocks'][block]
+            columns['x'] = np.load(os.path.join(self.root, 'grids', f"{info['geom_hash']}.npy"), mmap_mode='r')
+            columns['gamma'] = info['gamma']
+            columns['geom_hash'] = int(info['geom_hash'], 16)
+            self._blocks[block] = columns
+        return self._blocks[block]
+
+    def _block_pb_p0(self, block):
+        """Sorted pb/p0 column of a block (memory-mapped): the block's index."""
+        if block not in self._pb_p0:
+            path = os.path.join(self.root, 'blocks', f"{block:06d}", 'pb_p0.npy')
+            self._pb_p0[block] = np.load(path, mmap_mode='r')
+        return self._pb_p0[block]
+
+    def _find_blocks(self, geom_hash, gamma=None):
+        """Slice of the block table holding a geometry (and gamma)."""
+        table = self._table
+        key = table['geom_hash']
+        lo, hi = np.searchsorted(key, geom_hash, 'left'), np.searchsorted(key, geom_hash, 'right')
+        if gamma is not None:
+            key = table['gamma'][lo:hi]
+            lo, hi = lo + np.searchsorted(key, gamma, 'left'), lo + np.searchsorted(key, gamma, 'right')
+        return slice(int(lo), int(hi))
+
+    def geometry_params(self, geom_hash):
+        with open(os.path.join(self.root, 'grids', f"{geom_hash:016x}.json")) as f:
+            return json.load(f)
+
+    def query(self, params=None, geom_hash=None, gamma=None, pb_min=None, pb_max=None):
+        """Index rows matching a geometry, gamma and pb/p0 range (all optional).
+
+        The geometry is given either by its parameter dict or its hash.
+        Returns (geom_hash, gamma, pb_p0, block, row) records sorted by
+        geometry hash, gamma and pb/p0; only the matching blocks are read,
+        each with a binary search on its pb/p0 column.
+        """
+        if params is not None:
+            geom_hash = geometry_hash(params)
+        table = self._table
+        if geom_hash is not None:
+            table = table[self._find_blocks(geom_hash, gamma)]
+        elif gamma is not None:
+            table = table[table['gamma'] == gamma]
+        parts = []
+        for entry in table:
+            pb = self._block_pb_p0(int(entry['block']))
+            lo = 0 if pb_min is None else int(np.searchsorted(pb, pb_min, 'left'))
+            hi = len(pb) if pb_max is None else int(np.searchsorted(pb, pb_max, 'right'))
+            rows = np.empty(max(hi - lo, 0), dtype=INDEX_DTYPE)
+            rows['geom_hash'] = entry['geom_hash']
+            rows['gamma'] = entry['gamma']
+            rows['pb_p0'] = pb[lo:hi]
+            rows['block'] = entry['block']
+            rows['row'] = np.arange(lo, lo + len(rows))
+            parts.append(rows)
+        if not parts:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        index = np.concatenate(parts)
+        if len(parts) > 1:
+            # blocks are in key order already; merge the pb/p0 runs of equal keys
+            index = index[np.lexsort((index['pb_p0'], index['gamma'], index['geom_hash']))]
+        return index
+
+    def select(self, **query):
+        """Matching profiles as per-block column views (no copies).
+
+        Takes the same arguments as query. Returns a list of dicts with the
+        block's columns sliced to the matching rows, plus 'x', 'gamma' and
+        'geom_hash'.
+        """
+        rows = self.query(**query)
+        views = []
+        for block in np.unique(rows['block']):
+            r = np.sort(rows['row'][rows['block'] == block])
+            columns = self.block(int(block))
+            if r[-1] - r[0] + 1 == len(r):
+                take = slice(int(r[0]), int(r[-1]) + 1)
+            else:
+                take = r  # scattered rows: fancy indexing copies
+            view = {col: columns[col][take] for col in PROFILE_COLUMNS + SCALAR_COLUMNS}
+            view.update(x=columns['x'], gamma=columns['gamma'], geom_hash=columns['geom_hash'], block=int(block))
+            views.append(view)
+        return views
+
+    def load(self, **query):
+        """Matching profiles copied into one FlowProfile batch."""
+        views = self.select(**query)
+        if not views:
+            return FlowProfile(np.empty(0, dtype=profile_dtype(self.meta['n_points'] or 0)))
+        return FlowProfile.concatenate([
+            FlowProfile.from_arrays(v['x'], v['M'], v['p'],
+                                    **{col: v[col] for col in SCALAR_COLUMNS})
+            for v in views
+        ])
@@ -0,0 +1,330 @@
+"""Asyncio HTTP/JSON service for nozzle flow profiles.
+
+Run with::
+
+    python service.py --port 8765
+
+Endpoints:
+
+``POST /profile``
+    JSON body::
+
+        {"geometry": "parabolic" | "ssme",  # default parabolic
+         "params": {"a": 1.5, ...},         # geometry parameters (see cli.py)
+         "gamma": 1.4, "R": 287.0,
+         "pb_p0": 0.5 | [0.1, 0.5, ...],
+         "n_points": 1000, "n_plume": 100, "grid": "uniform",
+         "reduce": "exit,shock"}            # optional, see streaming.REDUCTIONS
+
+    Returns gamma, R, crit_p_ratios and, per pb/p0, either the full profile
+    (regime, x_shock, beta, x_extended, M, p on the shared grid ``x``) or
+    the reduced row.
+``GET /stats``
+    Cache, coalescing and executor counters.
+``GET /health``
+
+Warm Nozzle instances are kept in a bounded LRU keyed by geometry, gas
+and grid. Nozzle construction and solves run in a thread pool, so the
+event loop only parses, looks up and writes. Identical requests that
+arrive while one is being computed wait for that computation instead of
+starting their own, and finished responses are kept, already encoded, in
+an LRU bounded by total size; responses larger than 1/16 of that budget
+are not kept. All bookkeeping happens on the event loop thread.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cli import PARABOLIC_PARAM_NAMES, build_nozzle_geometry, json_scalar
+
+MAX_BODY = 1 << 20  # bytes
+MAX_CASES = 10000  # pb/p0 values per request
+MAX_PROFILE_POINTS = 1_000_000  # pb/p0 values x axial points in one full-profile response
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class RequestError(ValueError):
+    """Invalid request; reported to the client as HTTP 400."""
+
+
+def _float(value, name):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise RequestError(f"{name} must be a number, got {value!r}")
+
+
+def parse_profile_request(body):
+    """Validate a /profile request.
+
+    Returns:
+        (nozzle_key, pb_p0 tuple, reduce tuple or None)
+    """
+    from geometry import GEOMETRY_PARAM_NAMES
+    try:
+        spec = json.loads(body)
+    except ValueError as e:
+        raise RequestError(f"invalid JSON: {e}")
+    if not isinstance(spec, dict):
+        raise RequestError("request body must be a JSON object")
+
+    kind = spec.get('geometry', 'parabolic')
+    if kind not in ('parabolic', 'ssme'):
+        raise RequestError("geometry must be 'parabolic' or 'ssme'")
+    allowed = PARABOLIC_PARAM_NAMES if kind == 'parabolic' else GEOMETRY_PARAM_NAMES
+    params = spec.get('params', {})
+    if not isinstance(params, dict) or set(params) - set(allowed):
+        raise RequestError(f"params must be an object with keys from {', '.join(allowed)}")
+    # 10 significant digits, as in geometry.geometry_key, so round-off variants share a Nozzle
+    params = tuple((k, float(f"{_float(v, k):.10g}")) for k, v in sorted(params.items()))
+
+    gamma = _float(spec.get('gamma'), 'gamma')
+    R = _float(spec.get('R', 287.0), 'R')
+    if not gamma > 1:
+        raise RequestError("gamma must be > 1")
+    if not R > 0:
+        raise RequestError("R must be > 0")
+    grid = spec.get('grid', 'uniform')
+    if grid not in ('uniform', 'adaptive'):
+        raise RequestError("grid must be 'uniform' or 'adaptive'")
+    try:
+        n_points = int(spec.get('n_points', 1000))
+        n_plume = int(spec.get('n_plume', 100))
+    except (TypeError, ValueError):
+        raise RequestError("n_points and n_plume must be integers")
+    if not (10 <= n_points <= 20000 and 2 <= n_plume <= 2000):
+        raise RequestError("n_points must be in [10, 20000] and n_plume in [2, 2000]")
+
+    pb = spec.get('pb_p0')
+    pb = tuple(_float(v, 'pb_p0') for v in (pb if isinstance(pb, list) else [pb]))
+    if not 1 <= len(pb) <= MAX_CASES:
+        raise RequestError(f"pb_p0 must hold 1 to {MAX_CASES} values")
+    if any(not 0 < v <= 1 for v in pb):
+        raise RequestError("pb_p0 values must be in (0, 1]")
+
+    reduce = spec.get('reduce')
+    if reduce is not None:
+        from streaming import REDUCTIONS
+        if isinstance(reduce, str):
+            reduce = reduce.split(',')
+        if not isinstance(reduce, list) or not reduce or not all(isinstance(name, str) for name in reduce):
+            raise RequestError("reduce must be a comma-separated string or a non-empty list of names")
+        reduce = tuple(name.strip() for name in reduce)
+        unknown = [name for name in reduce if name not in REDUCTIONS]
+        if unknown:
+            raise RequestError(f"unknown reductions {unknown}; choose from {sorted(REDUCTIONS)}")
+    elif len(pb) * (n_points + n_plume - 1) > MAX_PROFILE_POINTS:
+        raise RequestError(f"full profiles are limited to {MAX_PROFILE_POINTS} values of pb_p0 x points; "
+                           f"send fewer pb_p0 values or use reduce")
+
+    return (kind, params, gamma, R, n_points, n_plume, grid), pb, reduce
+
+
+def build_nozzle(nozzle_key):
+    from nozzle import Nozzle
+    kind, params, gamma, R, n_points, n_plume, grid = nozzle_key
+    geometry = build_nozzle_geometry(kind, params, n_points=n_points, n_plume=n_plume, grid=grid)
+    return Nozzle.from_geometry(geometry, gamma, R)
+
+
+def solve_and_encode(nozzle, pb_p0_ratios, reduce):
+    """Sweep on ``nozzle`` and return the encoded JSON response body."""
+    from flow_profile import REGIME_NAMES
+    profiles = nozzle.sweep(np.array(pb_p0_ratios))
+    response = {
+        'gamma': nozzle.g,
+        'R': nozzle.R,
+        'crit_p_ratios': [nozzle.crit_p_ratio_1, nozzle.crit_p_ratio_2, nozzle.crit_p_ratio_3],
+    }
+    if reduce:
+        from streaming import make_reducer
+        rows = make_reducer(nozzle, list(reduce))(profiles)
+        response['rows'] = [{name: json_scalar(row[name]) for name in rows.dtype.names} for row in rows]
+    else:
+        response['x'] = nozzle.xeval.tolist()
+        response['profiles'] = [{
+            'pb_p0': float(fp.pb_p0),
+            'regime': int(fp.regime),
+            'regime_name': REGIME_NAMES[int(fp.regime)],
+            'x_shock': json_scalar(fp.x_shock),
+            'beta': json_scalar(fp.beta),
+            'x_extended': json_scalar(fp.x_extended),
+            'M': fp.M.tolist(),
+            'p': fp.p.tolist(),
+        } for fp in profiles]
+    return json.dumps(response).encode()
+
+
+class NozzleService(object):
+    """Warm Nozzle pool, response cache and request coalescing."""
+
+    def __init__(self, max_nozzles=32, cache_bytes=256 << 20, workers=None) -> None:
+        self.max_nozzles = max_nozzles
+        self.cache_bytes = cache_bytes
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='nozzle-solve')
+        self._nozzles = OrderedDict()
+        self._responses = OrderedDict()
+        self._response_bytes = 0
+        self._inflight = {}
+        self.stats = defaultdict(int)
+        self.started = time.time()
+
+    async def _coalesced(self, key, func, *args):
+        """Run func(*args) in the executor, sharing one run among identical keys."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.stats['computed'] += 1
+        else:
+            self.stats['coalesced'] += 1
+        # shield: a client hanging up must not cancel work others wait on
+        return await asyncio.shield(future)
+
+    async def nozzle(self, nozzle_key):
+        if nozzle_key in self._nozzles:
+            self._nozzles.move_to_end(nozzle_key)
+            self.stats['nozzle_hits'] += 1
+            return self._nozzles[nozzle_key]
+        self.stats['nozzle_misses'] += 1
+        nozzle = await self._coalesced(('nozzle', nozzle_key), build_nozzle, nozzle_key)
+        self._nozzles[nozzle_key] = nozzle
+        while len(self._nozzles) > self.max_nozzles:
+            self._nozzles.popitem(last=False)
+        return nozzle
+
+    async def profile(self, body):
+        nozzle_key, pb, reduce = parse_profile_request(body)
+        key = (nozzle_key, pb, reduce)
+        if key in self._responses:
+            self._responses.move_to_end(key)
+            self.stats['cache_hits'] += 1
+            return self._responses[key]
+        self.stats['cache_misses'] += 1
+        nozzle = await self.nozzle(nozzle_key)
+        encoded = await self._coalesced(('profile', key), solve_and_encode, nozzle, pb, reduce)
+        if len(encoded) > self.cache_bytes // 16:
+            self.stats['uncached'] += 1
+            return encoded
+        if key not in self._responses:  # a coalesced request may have stored it already
+            self._responses[key] = encoded
+            self._response_bytes += len(encoded)
+        while self._response_bytes > self.cache_bytes:
+            _, evicted = self._responses.popitem(last=False)
+            self._response_bytes -= len(evicted)
+        return encoded
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            'nozzles': len(self._nozzles),
+            'cached_responses': len(self._responses),
+            'cached_bytes': self._response_bytes,
+            'inflight': len(self._inflight),
+            'uptime': time.time() - self.started,
+        }
+
+    async def dispatch(self, method, path, body):
+        """(status, encoded JSON body) for one request."""
+        path = path.split('?', 1)[0]
+        if path == '/profile':
+            if method != 'POST':
+                return 405, b'{"error": "use POST"}'
+            return 200, await self.profile(body)
+        if path in ('/stats', '/health'):
+            if method != 'GET':
+                return 405, b'{"error": "use GET"}'
+            return 200, json.dumps(self.snapshot() if path == '/stats' else {'status': 'ok'}).encode()
+        return 404, b'{"error": "not found"}'
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection (keep-alive)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # the body cannot be delimited: answer and drop the connection
+                    status, payload = 400, b'{"error": "invalid Content-Length"}'
+                    keep_alive = False
+                elif length > MAX_BODY:
+                    status, payload = 413, b'{"error": "request body too large"}'
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    self.stats['requests'] += 1
+                    try:
+                        status, payload = await self.dispatch(method, path, body)
+                    except ValueError as e:  # RequestError, or inputs the solver rejects
+                        status, payload = 400, json.dumps({'error': str(e)}).encode()
+                    except Exception as e:
+                        status, payload = 500, json.dumps({'error': f"{type(e).__name__}: {e}"}).encode()
+                    keep_alive = (version == 'HTTP/1.1') != (headers.get('connection', '').lower() == 'close')
+                if status != 200:
+                    self.stats[f'status_{status}'] += 1
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, ready=None):
+        """Serve until cancelled; ``ready`` is called with the bound (host, port)."""
+        server = await asyncio.start_server(self.handle, host, port)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve nozzle flow profiles over HTTP/JSON.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help='0 picks a free port')
+    parser.add_argument('--workers', type=int, default=None, help='solver threads (default: executor default)')
+    parser.add_argument('--max-nozzles', type=int, default=32, help='warm Nozzle instances kept (default 32)')
+    parser.add_argument('--cache-mb', type=float, default=256, help='encoded responses kept, in MB (default 256)')
+    args = parser.parse_args(argv)
+
+    service = NozzleService(args.max_nozzles, int(args.cache_mb * (1 << 20)), args.workers)
+    ready = lambda addr: print(f"listening on http://{addr[0]}:{addr[1]}", flush=True)
+    try:
+        asyncio.run(service.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Streaming back-pressure sweeps with bounded memory.
+
+``stream_profiles`` pulls pb/p0 values from any iterable (including
+generators of unknown length) ``batch_size`` at a time, solves each batch
+with ``Nozzle.sweep`` and yields it. Only the current batch (plus at most
+``prefetch`` batches solved ahead) is ever held in memory.
+
+Batches can be reduced as they are produced, e.g. to keep only exit
+quantities, the shock location or the Mach extrema per case::
+
+    for rows in stream_profiles(nozzle, pb_values, reduce=['exit', 'shock']):
+        ...  # structured array, one row per pb/p0
+"""
+import itertools
+import queue
+import threading
+
+import numpy as np
+
+
+def _exit_state(nozzle, profiles):
+    i_exit = len(nozzle.x) - 1
+    return {"M_exit": profiles.M[:, i_exit], "p_exit": profiles.p[:, i_exit]}
+
+
+def _shock(nozzle, profiles):
+    return {"x_shock": profiles.x_shock, "beta": profiles.beta}
+
+
+def _mach_extrema(nozzle, profiles):
+    return {"M_min": profiles.M.min(axis=1), "M_max": profiles.M.max(axis=1)}
+
+
+# name -> function(nozzle, FlowProfile batch) returning a dict of per-case columns
+REDUCTIONS = {
+    "exit": _exit_state,
+    "shock": _shock,
+    "mach_extrema": _mach_extrema,
+}
+
+
+def make_reducer(nozzle, reduce):
+    """Turn ``reduce`` into a function of a FlowProfile batch.
+
+    ``reduce`` is a callable taking the batch, a name from REDUCTIONS, or a
+    list of names whose columns are merged. Named reductions return a
+    structured array with pb_p0, regime and their columns.
+    """
+    if callable(reduce):
+        return reduce
+    names = [reduce] if isinstance(reduce, str) else list(reduce)
+    unknown = [name for name in names if name not in REDUCTIONS]
+    if unknown:
+        raise ValueError(f"Unknown reductions {unknown}; choose from {sorted(REDUCTIONS)}")
+
+    def reducer(profiles):
+        columns = {"pb_p0": profiles.pb_p0, "regime": profiles.regime}
+        for name in names:
+            columns.update(REDUCTIONS[name](nozzle, profiles))
+        rows = np.empty(len(profiles), dtype=[(k, np.asarray(v).dtype) for k, v in columns.items()])
+        for k, v in columns.items():
+            rows[k] = v
+        return rows
+
+    return reducer
+
+
+def _batches(pb_p0_ratios, batch_size):
+    it = iter(pb_p0_ratios)
+    while True:
+        batch = np.fromiter(itertools.islice(it, batch_size), dtype=float)
+        if batch.size == 0:
+            return
+        yield batch
+
+
+def stream_profiles(nozzle, pb_p0_ratios, batch_size=1024, reduce=None, prefetch=0):
+    """Lazily solve a large or unbounded sequence of back-pressure ratios.
+
+    Parameters:
+    -----------
+    nozzle : Nozzle
+    pb_p0_ratios : iterable of float
+        Consumed incrementally, ``batch_size`` values at a time
+    batch_size : int
+        Cases solved together with Nozzle.sweep
+    reduce : None, str, list of str or callable
+        None yields the FlowProfile batches; otherwise see make_reducer
+    prefetch : int
+        Number of batches a background thread may solve ahead of the
+        consumer. 0 solves on demand. The thread blocks when the queue is
+        full, so a slow consumer throttles the producer.
+
+    Yields:
+    -------
+    One item per batch: a FlowProfile batch, or the reduced result.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+    reducer = None if reduce is None else make_reducer(nozzle, reduce)
+
+    def solve(batch):
+        profiles = nozzle.sweep(batch)
+        return profiles if reducer is None else reducer(profiles)
+
+    if prefetch <= 0:
+        for batch in _batches(pb_p0_ratios, batch_size):
+            yield solve(batch)
+        return
+
+    results = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # give up if the consumer went away, instead of blocking forever
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for batch in _batches(pb_p0_ratios, batch_size):
+                if not put((solve(batch), None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((None, e))
+
+    worker = threading.Thread(target=produce, name="stream_profiles", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item, error = results.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+        worker.join()
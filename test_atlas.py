@@ -0,0 +1,94 @@
+"""Tests for the background profile atlas."""
+import numpy as np
+import pytest
+
+from atlas import ProfileAtlas
+from geometry import get_parabolic_A
+from nozzle import Nozzle
+
+PB = np.geomspace(0.01, 0.99, 60)
+CHUNK = 8
+
+
+class RecordingNozzle(object):
+    """Nozzle stand-in that records the pb/p0 chunks the worker sweeps."""
+
+    def __init__(self, nozzle, on_sweep=None):
+        self.nozzle = nozzle
+        self.xeval = nozzle.xeval
+        self.on_sweep = on_sweep
+        self.swept = []
+
+    def sweep(self, pb_p0_ratios):
+        self.swept.append(np.array(pb_p0_ratios))
+        if self.on_sweep is not None:
+            self.on_sweep()
+        return self.nozzle.sweep(pb_p0_ratios)
+
+
+@pytest.fixture(scope='module')
+def parabolic():
+    A, xmin, xmax = get_parabolic_A()
+    return Nozzle(A, xmin=xmin, xmax=xmax, gamma=1.4, R=287.0)
+
+
+def run_to_end(atlas, pb=None):
+    atlas.start(pb)
+    atlas._thread.join(timeout=60)
+    assert not atlas.running
+
+
+def test_lookup_before_compute_is_none(parabolic):
+    atlas = ProfileAtlas(parabolic, PB, chunk=CHUNK)
+    assert atlas.n_computed == 0
+    assert all(atlas.lookup(pb) is None for pb in PB)
+    run_to_end(atlas)
+    assert atlas.n_computed == len(PB)
+    # off the grid is never served
+    assert atlas.lookup(0.5 * (PB[10] + PB[11])) is None
+
+
+def test_lookup_matches_sweep(parabolic):
+    atlas = ProfileAtlas(parabolic, PB, chunk=CHUNK)
+    run_to_end(atlas)
+    expected = parabolic.sweep(PB)
+    for i, pb in enumerate(PB):
+        profile = atlas.lookup(pb)
+        np.testing.assert_array_equal(profile.x, parabolic.xeval)
+        np.testing.assert_allclose(profile.M, expected.M[i], rtol=1e-6, atol=1e-6)
+        np.testing.assert_allclose(profile.p, expected.p[i], rtol=1e-6, atol=1e-6)
+        assert profile.regime == expected.regime[i]
+        np.testing.assert_array_equal(profile.x_shock, expected.x_shock[i])
+
+
+def test_focused_chunk_is_computed_first(parabolic):
+    nozzle = RecordingNozzle(parabolic)
+    atlas = ProfileAtlas(nozzle, PB, chunk=CHUNK)
+    focus = 37
+    run_to_end(atlas, PB[focus])
+    chunks = [int(np.searchsorted(PB, swept[0])) // CHUNK for swept in nozzle.swept]
+    assert sorted(chunks) == list(range(len(atlas._state)))
+    assert chunks[0] == focus // CHUNK
+    # then outward from the focus
+    distance = np.abs(np.array(chunks) - focus // CHUNK)
+    assert np.all(np.diff(distance) >= 0)
+
+
+def test_stop_ends_the_worker_and_start_resumes(parabolic):
+    nozzle = RecordingNozzle(parabolic)
+    atlas = ProfileAtlas(nozzle, PB, chunk=CHUNK)
+    nozzle.on_sweep = atlas.stop
+    run_to_end(atlas, PB[0])
+    # the chunk in progress is finished, nothing after it
+    assert len(nozzle.swept) == 1
+    assert atlas.n_computed == CHUNK
+    assert atlas.lookup(PB[0]) is not None and atlas.lookup(PB[-1]) is None
+    nozzle.on_sweep = None
+    run_to_end(atlas)
+    assert atlas.n_computed == len(PB)
+    assert len(nozzle.swept) == len(atlas._state)
+
+
+def test_rejects_unsorted_grid(parabolic):
+    with pytest.raises(ValueError):
+        ProfileAtlas(parabolic, PB[::-1])
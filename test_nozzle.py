@@ -0,0 +1,196 @@
+"""Tests for the nozzle solver: area-Mach inversion, shock location and batched sweeps."""
+import numpy as np
+import pytest
+from scipy.optimize import brentq
+
+import kernels
+from geometry import get_parabolic_A
+from flow_profile import (REGIME_EXPANSION_FAN, REGIME_NORMAL_SHOCK, REGIME_OBLIQUE_SHOCK,
+                          REGIME_SUBSONIC)
+from nozzle import Nozzle, NozzleGeometry
+
+GAMMAS = (1.15, 1.4, 1.67)
+
+
+def brentq_mach(ratio, gamma, is_subsonic):
+    """Reference inversion of A/A*(M) = ratio with brentq on [0, 1] or [1, 20]."""
+    if ratio <= 1.0:
+        return 1.0
+    f = lambda M: kernels.area_mach_relation(M, gamma) - ratio
+    lo, hi = (1e-12, 1.0) if is_subsonic else (1.0, 20.0)
+    return brentq(f, lo, hi, xtol=1e-14, rtol=1e-14)
+
+
+def regime_pressures(nozzle):
+    """pb/p0 values covering all four regimes, unsorted."""
+    c1, c2, c3 = nozzle.crit_p_ratio_1, nozzle.crit_p_ratio_2, nozzle.crit_p_ratio_3
+    pbs = np.concatenate([np.linspace(c1, 1.0, 5)[1:], np.linspace(c2, c1, 8)[1:-1],
+                          np.linspace(c3, c2, 7)[1:-1], np.geomspace(1e-6, c3, 5)[:-1]])
+    return np.random.default_rng(0).permutation(pbs)
+
+
+def viz_regime(viz):
+    if viz['flag_draw_nshock']:
+        return REGIME_NORMAL_SHOCK
+    if viz['flag_draw_oshock']:
+        return REGIME_OBLIQUE_SHOCK
+    if viz['flag_draw_fan']:
+        return REGIME_EXPANSION_FAN
+    return REGIME_SUBSONIC
+
+
+@pytest.fixture(scope='module')
+def parabolic():
+    A, xmin, xmax = get_parabolic_A()
+    return Nozzle(A, xmin=xmin, xmax=xmax, gamma=1.4, R=287.0)
+
+
+@pytest.fixture(scope='module', params=('parabolic', 'ssme'))
+def nozzle(request, parabolic):
+    if request.param == 'parabolic':
+        return parabolic
+    pytest.importorskip('rocketisp')
+    from geometry import SSME_DEFAULT_PARAMS, get_cached_A
+    A, xmin, xmax = get_cached_A(**SSME_DEFAULT_PARAMS)
+    return Nozzle(A, xmin=xmin, xmax=xmax, gamma=1.2, R=287.0)
+
+
+@pytest.mark.parametrize('gamma', GAMMAS)
+@pytest.mark.parametrize('is_subsonic', (True, False))
+def test_inversion_matches_brentq(gamma, is_subsonic):
+    r_max = 1e4 if is_subsonic else kernels.area_mach_relation(20.0, gamma)
+    ratios = np.concatenate([[1.0, 1.0 + 1e-9, 1.0 + 1e-4], np.geomspace(1.001, r_max, 200)])
+    M = Nozzle.solve_mach_numbers_from_area_ratios(ratios, gamma, is_subsonic=is_subsonic)
+    expected = [brentq_mach(r, gamma, is_subsonic) for r in ratios]
+    np.testing.assert_allclose(M, expected, rtol=0, atol=1e-8)
+    assert np.all(M <= 1.0) if is_subsonic else np.all(M >= 1.0)
+
+
+def test_inversion_mixed_branches():
+    ratios = np.array([1.5, 1.5, 4.0, 4.0])
+    subsonic = np.array([True, False, True, False])
+    M = Nozzle.solve_mach_numbers_from_area_ratios(ratios, 1.4, is_subsonic=subsonic)
+    np.testing.assert_allclose(M, [brentq_mach(r, 1.4, s) for r, s in zip(ratios, subsonic)], atol=1e-8)
+
+
+def test_inversion_below_one_is_sonic():
+    for is_subsonic in (True, False):
+        M = Nozzle.solve_mach_numbers_from_area_ratios(np.array([1.0 - 1e-12, 1.0]), 1.4, is_subsonic=is_subsonic)
+        np.testing.assert_allclose(M, 1.0, rtol=0, atol=1e-8)
+
+
+def test_inversion_infinite_ratio():
+    # A/A* -> inf as M -> 0 on the subsonic branch; there is no supersonic solution
+    M = Nozzle.solve_mach_numbers_from_area_ratios(np.array([np.inf]), 1.4, is_subsonic=True)
+    assert np.isfinite(M[0]) and 0.0 <= M[0] < 1e-6
+    with pytest.raises(ValueError):
+        Nozzle.solve_mach_numbers_from_area_ratios(np.array([np.inf]), 1.4, is_subsonic=False)
+
+
+def test_scalar_solver_matches_array_solver(parabolic):
+    for is_subsonic in (True, False):
+        M = parabolic.solve_mach_number_from_area_ratio(2.5, 1.4, is_subsonic=is_subsonic)
+        assert isinstance(M, float)
+        assert M == pytest.approx(brentq_mach(2.5, 1.4, is_subsonic), abs=1e-8)
+
+
+def test_normal_shock_exit_pressure_matches_back_pressure(nozzle):
+    k = len(nozzle.x)
+    for pb in np.linspace(nozzle.crit_p_ratio_2, nozzle.crit_p_ratio_1, 12)[1:-1]:
+        M, p, viz = nozzle._calculate_flow_profile(pb)
+        assert viz['flag_draw_nshock']
+        assert nozzle.x_throat < viz['x_shock'] < nozzle.xmax
+        assert p[k - 1] == pytest.approx(pb, rel=1e-12)
+        assert M[k - 1] < 1.0
+
+
+def test_normal_shock_moves_downstream_as_back_pressure_drops(nozzle):
+    pbs = np.linspace(nozzle.crit_p_ratio_1, nozzle.crit_p_ratio_2, 12)[1:-1]
+    x_shock = [nozzle._calculate_flow_profile(pb)[2]['x_shock'] for pb in pbs]
+    assert np.all(np.diff(x_shock) > 0)
+
+
+def test_sweep_matches_single_profiles(nozzle):
+    pbs = regime_pressures(nozzle)
+    batch = nozzle.sweep(pbs)
+    assert len(batch) == len(pbs)
+    np.testing.assert_array_equal(batch.pb_p0, pbs)
+    assert set(batch.regime.tolist()) == {REGIME_SUBSONIC, REGIME_NORMAL_SHOCK,
+                                          REGIME_OBLIQUE_SHOCK, REGIME_EXPANSION_FAN}
+    for i, pb in enumerate(pbs):
+        M, p, viz = nozzle._calculate_flow_profile(pb)
+        np.testing.assert_allclose(batch.M[i], M, rtol=0, atol=1e-8)
+        np.testing.assert_allclose(batch.p[i], p, rtol=0, atol=1e-8)
+        np.testing.assert_array_equal(batch.x[i], nozzle.xeval)
+        assert batch.regime[i] == viz_regime(viz)
+        for name in ('x_shock', 'beta', 'x_extended'):
+            if viz[name] is None:
+                assert np.isnan(batch.data[name][i])
+            else:
+                assert batch.data[name][i] == pytest.approx(viz[name], rel=1e-12)
+
+
+def test_sweep_rejects_out_of_range_pressures(parabolic):
+    for bad in ([0.5, 0.0], [1.5], [[0.5]]):
+        with pytest.raises(ValueError):
+            parabolic.sweep(bad)
+
+
+@pytest.mark.skipif('numba' not in kernels.available_backends(), reason='numba is not installed')
+def test_numba_backend_matches_numpy(nozzle):
+    pbs = regime_pressures(nozzle)
+    reference = type(nozzle).from_geometry(nozzle.geometry, nozzle.g, nozzle.R, backend='numpy')
+    compiled = type(nozzle).from_geometry(nozzle.geometry, nozzle.g, nozzle.R, backend='numba')
+    assert compiled.kernels.name == 'numba'
+    ratios = np.geomspace(1.001, 50.0, 100)
+    for is_subsonic in (True, False):
+        np.testing.assert_allclose(
+            Nozzle.solve_mach_numbers_from_area_ratios(ratios, 1.3, is_subsonic=is_subsonic, backend='numba'),
+            Nozzle.solve_mach_numbers_from_area_ratios(ratios, 1.3, is_subsonic=is_subsonic, backend='numpy'),
+            rtol=0, atol=1e-8)
+    expected = reference.sweep(pbs)
+    batch = compiled.sweep(pbs)
+    np.testing.assert_array_equal(batch.regime, expected.regime)
+    np.testing.assert_allclose(batch.M, expected.M, rtol=0, atol=1e-8)
+    np.testing.assert_allclose(batch.p, expected.p, rtol=0, atol=1e-8)
+    np.testing.assert_allclose(batch.x_shock, expected.x_shock, rtol=1e-10)
+
+
+def test_gammas_share_one_geometry(parabolic):
+    nozzles = [parabolic.with_gas(gamma) for gamma in GAMMAS]
+    nozzles.append(Nozzle.from_geometry(parabolic.geometry, 1.3, 287.0))
+    for other in nozzles:
+        assert other.geometry is parabolic.geometry
+        for name in ('x', 'xeval', 'area_array'):
+            assert np.shares_memory(getattr(other, name), getattr(parabolic, name))
+    # a shared geometry solves like a nozzle built from scratch
+    A, xmin, xmax = get_parabolic_A()
+    fresh = Nozzle(A, xmin=xmin, xmax=xmax, gamma=1.3, R=287.0)
+    np.testing.assert_array_equal(nozzles[-1].sweep([0.7, 0.01]).M, fresh.sweep([0.7, 0.01]).M)
+
+
+def test_geometry_arrays_are_read_only(parabolic):
+    geometry = parabolic.geometry
+    assert isinstance(geometry, NozzleGeometry)
+    for name in ('x', 'xeval', 'area_array', 'area_array_before_throat', 'area_array_after_throat'):
+        with pytest.raises(ValueError):
+            getattr(geometry, name)[0] = 0.0
+
+
+@pytest.mark.parametrize('name', ('area_exit', 'area_throat'))
+def test_area_setters_copy_the_geometry(parabolic, name):
+    shared = parabolic.with_gas(1.3)
+    other = shared.with_gas(1.4)
+    crit = parabolic.crit_p_ratio_1
+    value = getattr(shared, name)
+    setattr(shared, name, 1.1 * value)
+    assert getattr(shared, name) == 1.1 * value
+    assert shared.geometry is not parabolic.geometry
+    # the nozzles still on the shared geometry are unchanged
+    for nozzle in (parabolic, other):
+        assert nozzle.geometry is parabolic.geometry
+        assert getattr(nozzle, name) == value
+    assert parabolic.geometry.area_exit == parabolic.A(parabolic.xmax)
+    assert parabolic.crit_p_ratio_1 == crit
+    # the arrays are still shared with the copy
+    assert np.shares_memory(shared.x, parabolic.x)
@@ -0,0 +1,115 @@
+"""Tests for the Plotly renderers."""
+import base64
+
+import numpy as np
+import pytest
+
+pytest.importorskip('plotly')
+
+from geometry import get_parabolic_A
+from nozzle import Nozzle
+from plotting import _keep_indices, downsample, lttb
+
+
+def decode(values):
+    """Plotly data array (plain or a base64 typed-array spec) as a numpy array."""
+    if isinstance(values, dict):
+        return np.frombuffer(base64.b64decode(values['bdata']), dtype=values['dtype'])
+    return np.asarray(values)
+
+
+@pytest.fixture(scope='module')
+def parabolic():
+    A, xmin, xmax = get_parabolic_A()
+    return Nozzle(A, xmin=xmin, xmax=xmax, gamma=1.4, R=287.0)
+
+
+@pytest.fixture(scope='module')
+def fine():
+    A, xmin, xmax = get_parabolic_A()
+    return Nozzle(A, xmin=xmin, xmax=xmax, gamma=1.4, R=287.0, n_points=20000)
+
+
+@pytest.mark.parametrize('n_out', (3, 10, 500, 4000))
+def test_lttb_indices(n_out):
+    x = np.linspace(0.0, 1.0, 5000)
+    y = np.sin(40 * x) * np.exp(-x)
+    idx = lttb(x, y, n_out)
+    assert len(idx) == n_out
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_lttb_short_input_is_returned_whole():
+    np.testing.assert_array_equal(lttb(np.arange(5.0), np.ones(5), 10), np.arange(5))
+
+
+@pytest.mark.parametrize('max_points', (50, 300, 2000))
+def test_downsample_keeps_throat_exit_and_shock(fine, max_points):
+    pb = 0.7  # normal shock in the divergent section
+    M, _, viz = fine._calculate_flow_profile(pb)
+    keep = _keep_indices(fine, viz['x_shock'])
+    i_shock = int(np.searchsorted(fine.x, viz['x_shock']))
+    assert {i_shock - 1, i_shock} <= set(keep)
+    idx = downsample(fine.xeval, M, max_points, keep)
+    assert np.all(np.diff(idx) > 0)
+    assert abs(len(idx) - max_points) <= len(keep) + 2
+    i_throat = int(np.argmin(np.abs(fine.x - fine.x_throat)))
+    assert {0, len(fine.xeval) - 1, i_throat, i_shock - 1, i_shock} <= set(idx.tolist())
+    # the jump across the shock survives downsampling
+    assert M[i_shock - 1] > 1.0 > M[i_shock]
+
+
+def test_webgl_switch_at_threshold(fine):
+    n = len(fine.xeval)
+    traces = lambda threshold: [t.type for t in fine.plot_flow_profile_plotly(0.3, webgl_threshold=threshold).data[:2]]
+    assert traces(n) == ['scatter', 'scatter']
+    assert traces(n - 1) == ['scattergl', 'scattergl']
+    assert traces(None) == ['scatter', 'scatter']
+    # downsampled traces count the kept points
+    n_kept = len(fine.plot_flow_profile_plotly(0.3, max_points=300).data[0].x)
+    assert n_kept < n
+    for threshold, expected in ((n_kept, 'scatter'), (n_kept - 1, 'scattergl')):
+        fig = fine.plot_flow_profile_plotly(0.3, max_points=300, webgl_threshold=threshold)
+        assert fig.data[0].type == expected
+
+
+@pytest.mark.parametrize('pb', (0.95, 0.7, 0.3, 0.01))
+def test_profile_figure_data_reads_back_as_arrays(parabolic, pb):
+    M, p, _ = parabolic._calculate_flow_profile(pb)
+    for _ in range(2):  # built from a fresh, then from the cached template
+        fig = parabolic.plot_flow_profile_plotly(pb)
+        for trace in fig.data:
+            assert isinstance(trace.x, np.ndarray) and isinstance(trace.y, np.ndarray)
+            assert trace.x.shape == trace.y.shape
+        np.testing.assert_array_equal(fig.data[0].y, M)
+        np.testing.assert_array_equal(fig.data[1].y, p)
+        np.testing.assert_allclose(fig.data[2].y, np.sqrt(parabolic.area_array / np.pi))
+        assert fig.layout.yaxis2.title.text == 'r(x) (Radius)'
+
+
+def test_sweep_figure_data_reads_back_as_arrays(parabolic):
+    fig = parabolic.plot_flow_sweep_plotly([0.95, 0.01])
+    for trace in fig.data[:3]:
+        assert isinstance(trace.x, np.ndarray) and isinstance(trace.y, np.ndarray)
+
+
+@pytest.mark.parametrize('max_points', (None, 300))
+def test_sweep_frames_hold_the_profiles(parabolic, max_points):
+    pbs = np.array([0.95, 0.7, 0.3, 0.01])
+    profiles = parabolic.sweep(pbs)
+    fig = parabolic.plot_flow_sweep_plotly(pbs, max_points=max_points)
+    assert len(fig.frames) == len(pbs)
+    # initial traces are plain arrays: the first profile
+    assert isinstance(fig.data[0].y, np.ndarray)
+    if max_points is None:
+        np.testing.assert_array_equal(fig.data[0].y, profiles.M[0])
+    for frame, profile in zip(fig.frames, profiles):
+        M_trace = frame.data[0]
+        y = decode(M_trace.y)
+        if max_points is None:
+            np.testing.assert_allclose(y, profile.M, rtol=1e-6)
+        else:
+            # downsampled: a subset of the profile's points, in order
+            assert len(decode(M_trace.x)) == len(y) <= max_points + 5
+            assert np.all(np.isin(y, profile.M.astype(y.dtype)))
@@ -0,0 +1,108 @@
+"""Tests for the memory-mapped result store."""
+import numpy as np
+import pytest
+
+from geometry import get_parabolic_A
+from nozzle import Nozzle
+from result_store import ResultStore, geometry_hash
+
+N_POINTS = 50
+
+
+def make_batch(a, gamma, pbs, **grid):
+    A, xmin, xmax = get_parabolic_A(a=a)
+    grid.setdefault('n_points', N_POINTS)
+    return Nozzle(A, xmin=xmin, xmax=xmax, gamma=gamma, R=287.0, **grid).sweep(pbs)
+
+
+@pytest.fixture
+def filled(tmp_path):
+    """Store with three (geometry, gamma) keys, one of them appended twice."""
+    rng = np.random.default_rng(1)
+    batches = []
+    store = ResultStore(str(tmp_path))
+    for a, gamma in ((1.5, 1.4), (1.5, 1.3), (2.0, 1.4), (1.5, 1.4)):
+        batch = make_batch(a, gamma, rng.uniform(0.01, 0.99, 25))
+        store.append(batch, {'a': a}, gamma)
+        batches.append(({'a': a}, gamma, batch))
+    return str(tmp_path), batches
+
+
+def expected_rows(batches, params, gamma=None, pb_min=-np.inf, pb_max=np.inf):
+    """(pb_p0, M) of the matching source profiles, sorted by pb/p0."""
+    pb, M = [], []
+    for p, g, batch in batches:
+        if p == params and (gamma is None or g == gamma):
+            keep = (batch.pb_p0 >= pb_min) & (batch.pb_p0 <= pb_max)
+            pb.append(batch.pb_p0[keep])
+            M.append(batch.M[keep])
+    pb, M = np.concatenate(pb), np.concatenate(M)
+    order = np.argsort(pb, kind='stable')
+    return pb[order], M[order]
+
+
+def test_append_and_reopen(filled):
+    root, batches = filled
+    store = ResultStore(root)
+    assert len(store) == sum(len(b) for _, _, b in batches)
+    assert store.n_blocks == 4
+    assert store.geometry_params(geometry_hash({'a': 2.0})) == {'a': 2.0}
+    with pytest.raises(ValueError):
+        ResultStore(root, n_points=N_POINTS + 1)
+
+
+def test_index_is_sorted(filled):
+    index = ResultStore(filled[0]).index
+    keys = np.lexsort((index['pb_p0'], index['gamma'], index['geom_hash']))
+    np.testing.assert_array_equal(keys, np.arange(len(index)))
+
+
+@pytest.mark.parametrize('query', [
+    dict(params={'a': 1.5}, gamma=1.4),
+    dict(params={'a': 1.5}, gamma=1.4, pb_min=0.2, pb_max=0.6),
+    dict(params={'a': 2.0}, pb_max=0.5),
+    dict(params={'a': 1.5}),
+])
+def test_load_matches_appended_profiles(filled, query):
+    root, batches = filled
+    query = dict(query)
+    params = query.pop('params')
+    pb, M = expected_rows(batches, params, **query)
+    loaded = ResultStore(root).load(params=params, **query)
+    # one run per block, each sorted by pb/p0
+    order = np.argsort(loaded.pb_p0, kind='stable')
+    np.testing.assert_array_equal(loaded.pb_p0[order], pb)
+    if 'gamma' in query:
+        np.testing.assert_array_equal(loaded.M[order], M)
+    np.testing.assert_array_equal(loaded.x[0], batches[0][2].x[0])
+
+
+def test_query_by_gamma_and_unknown_geometry(filled):
+    root, batches = filled
+    store = ResultStore(root)
+    rows = store.query(gamma=1.4, pb_min=0.5)
+    assert np.all(rows['gamma'] == 1.4) and np.all(rows['pb_p0'] >= 0.5)
+    assert len(rows) == sum(np.count_nonzero(b.pb_p0 >= 0.5) for _, g, b in batches if g == 1.4)
+    assert len(store.query(params={'a': 9.0})) == 0
+    assert len(store.load(params={'a': 9.0})) == 0
+
+
+def test_select_returns_memory_mapped_views(filled):
+    root, _ = filled
+    views = ResultStore(root).select(params={'a': 2.0}, gamma=1.4, pb_min=0.3, pb_max=0.7)
+    assert len(views) == 1
+    view = views[0]
+    assert isinstance(view['M'], np.memmap)
+    assert np.all((view['pb_p0'] >= 0.3) & (view['pb_p0'] <= 0.7))
+    assert view['M'].shape == (len(view['pb_p0']), len(view['x']))
+
+
+# same number of stored points (n_points + n_plume - 1) as the store, other coordinates
+@pytest.mark.parametrize('grid', [dict(grid='adaptive'), dict(n_points=N_POINTS - 10, n_plume=110)])
+def test_append_rejects_a_different_grid(filled, grid):
+    root, _ = filled
+    store = ResultStore(root)
+    n_rows = len(store)
+    with pytest.raises(ValueError, match='different grid'):
+        store.append(make_batch(1.5, 1.4, [0.5], **grid), {'a': 1.5}, 1.4)
+    assert len(store) == n_rows and store.n_blocks == 4